@@ -5,6 +5,19 @@ import random
 
 import settings as sett
 
+from sprites import sprite_cache
+
+
+def store_field(name):
+	#Attribute kept in a column of an entity store (see stores.py) at the view's row
+	def get(self):
+		return getattr(self.store, name)[self.index]
+
+	def set(self, value):
+		getattr(self.store, name)[self.index] = value
+
+	return property(get, set)
+
 
 class Object:
 	def __init__(self, x = None, y = None):
@@ -44,6 +57,7 @@ class MovingObject(Object):
 		super().__init__(x, y)
 		self.orientation = 0
 		self.speed = 0
+		self.store_previous()
 	
 	def draw(self, screen, cam_x, cam_y):
 		offset_x, offset_y = super().draw(cam_x, cam_y)
@@ -56,6 +70,13 @@ class MovingObject(Object):
 		if not self.surface:
 			self.get_surface()
 			self.draw_self()
+
+	def interpolate(self, alpha):
+		#Position and heading alpha of the way from the previous physics step to this one
+		turn = (self.orientation - self.prev_orientation + 180) % 360 - 180
+		return (self.prev_x + (self.x - self.prev_x) * alpha,
+			self.prev_y + (self.y - self.prev_y) * alpha,
+			self.prev_orientation + turn * alpha)
 		
 	def move(self, dt = 1):
 		rad_direction = math.radians(self.orientation)
@@ -63,33 +84,38 @@ class MovingObject(Object):
 		lateral_vel = (self.speed * 1.5) * math.sin(rad_direction)
 		self.x += forward_vel
 		self.y += lateral_vel
-		self.wrap()
-		
-	def wrap(self):
-		if self.x < -sett.WORLD_WIDTH:
-			self.x = sett.WORLD_WIDTH
-		elif self.x > sett.WORLD_WIDTH:
-			self.x = -sett.WORLD_WIDTH
-		if self.y < -sett.WORLD_HEIGHT:
-			self.y = sett.WORLD_HEIGHT
-		elif self.y > sett.WORLD_HEIGHT:
-			self.y = -sett.WORLD_HEIGHT
+
+	def store_previous(self):
+		self.prev_x, self.prev_y, self.prev_orientation = self.x, self.y, self.orientation
 		
 			
 class StationaryObject(Object):
+	kind = "stationary"
+
 	def __init__(self, x = None, y = None):
 		super().__init__(x, y)
 		self.collision_radius_sq = (self.size * 1.01) ** 2
 		
-	def check_collision(self, collider):
-		return math.hypot(collider.x - self.x, collider.y - self.y) <= self.size * 1.05
-		
+	def contact(self, x0, y0, x1, y1, t, padding = 0):
+		#Where a move first touches this object, given where it entered the bounding circle (see collision.sweep)
+		if t == 0 and (x0 - self.x) * (x1 - x0) + (y0 - self.y) * (y1 - y0) > 0:
+			return None  #Already touching but heading out
+		return t
+
+	def radius_toward(self, x, y):
+		return self.size
+
 	def draw(self, screen, cam_x, cam_y, **kwargs):
 		offset_x, offset_y = super().draw(cam_x, cam_y)
-		if (offset_x + self.size >= -sett.WIDTH * 2 and offset_x <= sett.WIDTH * 3) and (offset_y + self.size >= -sett.HEIGHT * 2 and offset_y <= sett.HEIGHT * 3):
-			if not self.surface:
-				self.get_surface()
-				self.draw_self()
-			blit_x = int(offset_x - self.size)
-			blit_y = int(offset_y - self.size)
-			screen.blit(self.surface, (blit_x, blit_y))
+		if (offset_x + self.size < 0 or offset_x - self.size > sett.WIDTH or offset_y + self.size < 0 or offset_y - self.size > sett.HEIGHT):
+			return None  #Off-screen
+		return screen.blit(self.get_sprite(), (int(offset_x - self.size), int(offset_y - self.size)))
+
+	def get_sprite(self):
+		#Shared by every object of the same kind, size and color, rebuilt on demand after eviction or a load
+		return sprite_cache.get((self.kind, self.size, tuple(self.color)), self.render_sprite)
+
+	def render_sprite(self):
+		surface = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
+		pygame.draw.circle(surface, self.color, (self.size, self.size), self.size)
+		return surface
@@ -0,0 +1,210 @@
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+#Headless: must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+import settings as sett
+
+from profiler import Profiler
+from sprites import sprite_cache
+from world import World
+
+
+DOCKED_TICKS = 60
+ROCK_EVERY = 3  #Every third leg of the route is to a rock
+
+
+class Route:
+	#Scripted skipper: sails for the nearest island not yet visited and docks, every ROCK_EVERY-th leg runs onto the
+	#nearest rock instead. New islands only turn up in new chunks, so the route keeps loading them.
+	#The helm is set directly, a perfect player's input.
+	def __init__(self):
+		self.legs = 0
+		self.rock_hits = 0
+		self.target = None
+		self.visited = set()
+
+	def finish_leg(self):
+		self.visited.add((self.target.x, self.target.y))
+		self.legs += 1
+		self.target = None
+
+	def pick(self, world):
+		obstacles = world.rocks if self.legs % ROCK_EVERY == ROCK_EVERY - 1 else world.islands
+		boat = world.boat
+		choices = [obstacle for obstacle in obstacles if (obstacle.x, obstacle.y) not in self.visited]
+		return min(choices, key = lambda obstacle: math.hypot(obstacle.x - boat.x, obstacle.y - boat.y), default = None)
+
+	def steer(self, world):
+		boat = world.boat
+		if self.target is None:
+			self.target = self.pick(world)
+		if self.target is None:
+			#Nothing left nearby, head east until more loads
+			desired, distance = 90, math.inf
+		else:
+			dx, dy = self.target.x - boat.x, self.target.y - boat.y
+			distance = math.hypot(dx, dy) - self.target.size
+			if self.target.kind == "rock" and distance <= boat.size + 5:
+				self.rock_hits += 1
+				self.finish_leg()
+				return
+			desired = math.degrees(math.atan2(dx, -dy)) % 360
+
+		#Upwind or dead downwind: hold the nearest heading the sails drive on, as the fleet's autopilot does
+		direction, _ = world.boat_wind
+		relative = (direction - desired) % 360
+		if relative > 310 or relative < 50:
+			relative = 310 if relative > 180 else 50
+		elif 130 < relative < 230:
+			relative = 130 if relative < 180 else 230
+		desired = (direction - relative) % 360
+
+		boat.rudder = max(-30, min(30, (desired - boat.orientation + 180) % 360 - 180))
+		boat.sail = float(boat.polar.best_sail(direction - boat.orientation))
+		#Slow enough to dock by the time an island's shore comes up
+		boat.reef = 0.15 if self.target is not None and self.target.kind == "island" and distance < 800 else 1
+
+
+def run(ticks, cloud_extent, seed, clouds = None, dt = 1 / 60, render = False, track_allocations = False):
+	random.seed(seed)
+	#The world has no edge, this only sets how far around the boat clouds are kept
+	sett.WORLD_WIDTH, sett.WORLD_HEIGHT = cloud_extent, cloud_extent
+	profiler = Profiler(track_allocations = track_allocations)
+	world = World(profiler)
+	setup_start = time.perf_counter()
+	world.generate(sett.WIDTH // 2, sett.HEIGHT // 2, seed = seed, clouds = clouds)
+	setup_time = time.perf_counter() - setup_start
+	screen = pygame.display.get_surface() if render else None
+
+	gc.collect()
+	gc_before = sum(stat["collections"] for stat in gc.get_stats())
+	blocks_before = sys.getallocatedblocks()
+	if track_allocations:
+		tracemalloc.start()
+	docks = 0
+	docked_for = 0
+	chunks_seen = set()
+	route = Route()
+	start = time.perf_counter()
+	for _ in range(ticks):
+		boat = world.boat
+		if boat.stopped:
+			docked_for += 1
+			if docked_for >= DOCKED_TICKS:
+				boat.release()
+				docked_for = 0
+		else:
+			route.steer(world)
+		cam_x, cam_y = boat.x - sett.WIDTH // 2, boat.y - sett.HEIGHT // 2
+		#The game's own loop: fixed steps, the frame's LOD budget and world.time all come from advance
+		with profiler.span("tick"):
+			alpha = world.advance(dt, cam_x, cam_y)
+		if world.docked:
+			docks += 1
+			if route.target is world.docked:
+				route.finish_leg()
+		chunks_seen.update(world.chunks.chunks)
+		if screen:
+			with profiler.span("draw"):
+				screen.fill(sett.colors["LIGHT BLUE"])
+				world.draw(screen, cam_x, cam_y, alpha)
+	elapsed = time.perf_counter() - start
+	allocations = {
+		"allocated_blocks_delta": sys.getallocatedblocks() - blocks_before,
+		"gc_collections": sum(stat["collections"] for stat in gc.get_stats()) - gc_before,
+	}
+	if track_allocations:
+		current, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		allocations["traced_current_kb"] = round(current / 1024, 1)
+		allocations["traced_peak_kb"] = round(peak / 1024, 1)
+
+	sprites = {"entries": len(sprite_cache), "hits": sprite_cache.hits, "misses": sprite_cache.misses, "bytes": sprite_cache.used}
+	sprite_cache.clear()
+	return {
+		"config": {
+			"chunk_size": sett.CHUNK_SIZE,
+			"boats_per_chunk": sett.FLEET_BOATS_PER_CHUNK,
+			"cloud_extent": cloud_extent,
+			"clouds": len(world.clouds),
+			"dt": dt,
+			"islands_per_chunk": sett.ISLANDS_PER_CHUNK,
+			"render": render,
+			"rocks_per_chunk": sett.ROCKS_PER_CHUNK,
+			"screen": [sett.WIDTH, sett.HEIGHT],
+			"seed": seed,
+			"ticks": ticks,
+		},
+		"setup_ms": round(setup_time * 1000, 3),
+		"elapsed_s": round(elapsed, 4),
+		"ticks_per_sec": round(ticks / elapsed, 1) if elapsed else None,
+		"subsystems": profiler.report(),
+		"allocations": allocations,
+		"sprite_cache": sprites,
+		"final_state": {
+			"boat": [round(world.boat.x, 3), round(world.boat.y, 3), round(world.boat.orientation, 3), round(world.boat.speed, 3)],
+			"world_time_s": round(world.time / 1000, 3),
+			"docks": docks,
+			"fleet": len(world.fleet),
+			"islands": len(world.islands),
+			"chunks_loaded": len(chunks_seen),
+			"legs": route.legs,
+			"rock_hits": route.rock_hits,
+			"rocks": len(world.rocks),
+			"seagulls": len(world.seagulls),
+		},
+	}
+
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Headless, deterministic benchmark of the Polysail simulation loop.")
+	parser.add_argument("--ticks", type = int, default = 18000, help = "Frames of --dt each, the default is five minutes of sailing")
+	parser.add_argument("--cloud-extent", type = int, nargs = "+", default = [20000], help = "Half width of the cloud field kept around the boat, one run per value")
+	parser.add_argument("--seed", type = int, default = 1)
+	parser.add_argument("--chunk-size", type = int, default = sett.CHUNK_SIZE)
+	parser.add_argument("--islands-per-chunk", type = float, default = sett.ISLANDS_PER_CHUNK)
+	parser.add_argument("--rocks-per-chunk", type = float, default = sett.ROCKS_PER_CHUNK)
+	parser.add_argument("--boats-per-chunk", type = float, default = sett.FLEET_BOATS_PER_CHUNK, help = "NPC boats launched per chunk")
+	parser.add_argument("--clouds", type = int, help = "Defaults to the game's density for the cloud extent")
+	parser.add_argument("--dt", type = float, default = 1 / 60, help = "Frame time passed to World.advance, which steps at PHYSICS_HZ")
+	parser.add_argument("--width", type = int, default = 1280)
+	parser.add_argument("--height", type = int, default = 720)
+	parser.add_argument("--render", action = "store_true", help = "Also draw every tick to an off-screen display")
+	parser.add_argument("--allocations", action = "store_true", help = "Track allocated blocks per subsystem and tracemalloc peaks (slower)")
+	parser.add_argument("--output", help = "Write the JSON report here instead of stdout")
+	args = parser.parse_args(argv)
+
+	pygame.display.init()
+	pygame.font.init()
+	sett.WIDTH, sett.HEIGHT = args.width, args.height
+	sett.CHUNK_SIZE = args.chunk_size
+	sett.ISLANDS_PER_CHUNK, sett.ROCKS_PER_CHUNK = args.islands_per_chunk, args.rocks_per_chunk
+	sett.FLEET_BOATS_PER_CHUNK = args.boats_per_chunk
+	pygame.display.set_mode((sett.WIDTH, sett.HEIGHT))
+
+	results = [run(args.ticks, size, args.seed, args.clouds, args.dt, args.render, args.allocations) for size in args.cloud_extent]
+	pygame.quit()
+
+	report = json.dumps({"python": sys.version.split()[0], "pygame": pygame.version.ver, "runs": results}, indent = 2)
+	if args.output:
+		with open(args.output, "w") as f:
+			f.write(report)
+	else:
+		print(report)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,99 @@
+import math
+import random
+
+import settings as sett
+
+from objects import Island, Rock
+from syllables import Syllables
+
+
+class Chunk:
+	def __init__(self, cx, cy):
+		self.cx = cx
+		self.cy = cy
+		self.islands = []
+		self.nests = []
+		self.rocks = []
+		self.seagulls = []
+
+
+class ChunkManager:
+	def __init__(self, seed, spawn_x, spawn_y, chunk_size = None):
+		self.center = None
+		self.chunk_size = chunk_size or sett.CHUNK_SIZE
+		self.chunks = {}
+		self.seed = seed
+		self.spawn_x, self.spawn_y = spawn_x, spawn_y
+
+	def chunk_at(self, x, y):
+		return math.floor(x / self.chunk_size), math.floor(y / self.chunk_size)
+
+	def generate(self, cx, cy):
+		#Same seed and coordinates always give the same chunk
+		rng = random.Random(f"{self.seed}:{cx}:{cy}")
+		chunk = Chunk(cx, cy)
+		x0, y0 = cx * self.chunk_size, cy * self.chunk_size
+		min_distance = 200
+		if (cx, cy) == self.chunk_at(self.spawn_x, self.spawn_y):
+			island = Island(name=rng.choice(Syllables) + rng.choice(Syllables), x=self.spawn_x, y=self.spawn_y + 210, size=200)
+			chunk.islands.append(island)
+			self.spawn_seagulls(chunk, island, rng.randint(1, 5), 2000)
+		for _ in range(self.roll_count(rng, sett.ISLANDS_PER_CHUNK)):
+			x, y = self.random_position(rng, x0, y0, min_distance)
+			island = Island(name=rng.choice(Syllables) + rng.choice(Syllables), x=x, y=y, size=rng.randint(200, 600))
+			chunk.islands.append(island)
+			self.spawn_seagulls(chunk, island, rng.randint(1, 5), 2000)
+		for _ in range(self.roll_count(rng, sett.ROCKS_PER_CHUNK)):
+			x, y = self.random_position(rng, x0, y0, min_distance)
+			rock = Rock(x=x, y=y, size=rng.randint(10, 150))
+			chunk.rocks.append(rock)
+			self.spawn_seagulls(chunk, rock, rng.randint(0, 3), 700)
+		return chunk
+
+	def restore(self, cx, cy, islands, rocks, nests):
+		#Put back a chunk exactly as it was saved instead of regenerating it
+		chunk = Chunk(cx, cy)
+		chunk.islands = islands
+		chunk.rocks = rocks
+		chunk.nests = nests
+		self.chunks[cx, cy] = chunk
+		return chunk
+
+	def random_position(self, rng, x0, y0, min_distance):
+		x, y = x0 + rng.uniform(0, self.chunk_size), y0 + rng.uniform(0, self.chunk_size)
+		#Reject if too close to the spawn point
+		while ((x - self.spawn_x) ** 2 + (y - self.spawn_y) ** 2) < min_distance ** 2:
+			x, y = x0 + rng.uniform(0, self.chunk_size), y0 + rng.uniform(0, self.chunk_size)
+		return x, y
+
+	def roll_count(self, rng, expected):
+		#Whole part always, fractional part as a chance of one more
+		count = int(expected)
+		if rng.random() < expected - count:
+			count += 1
+		return count
+
+	def spawn_seagulls(self, chunk, home, count, max_radius):
+		#The world's flock hatches these when the chunk is loaded
+		chunk.nests.append((home.x, home.y, count, max_radius))
+
+	def update(self, x, y):
+		#Returns the chunks generated and dropped since the last call
+		center = self.chunk_at(x, y)
+		if center == self.center:
+			return [], []
+		self.center = center
+		load_radius, unload_radius = sett.CHUNK_LOAD_RADIUS, sett.CHUNK_UNLOAD_RADIUS
+		loaded = []
+		for cx in range(center[0] - load_radius, center[0] + load_radius + 1):
+			for cy in range(center[1] - load_radius, center[1] + load_radius + 1):
+				if (cx, cy) not in self.chunks:
+					chunk = self.generate(cx, cy)
+					self.chunks[cx, cy] = chunk
+					loaded.append(chunk)
+		unloaded = []
+		for key, chunk in list(self.chunks.items()):
+			if max(abs(key[0] - center[0]), abs(key[1] - center[1])) > unload_radius:
+				del self.chunks[key]
+				unloaded.append(chunk)
+		return loaded, unloaded
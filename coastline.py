@@ -0,0 +1,83 @@
+import math
+import numpy as np
+import pygame
+import random
+
+import settings as sett
+
+from sprites import sprite_cache
+
+
+class Coastline:
+	#Noise-perturbed outline around a center, the same island always gets the same shape.
+	#Kept as a small float32 vertex array relative to the center, furthest vertex exactly at size.
+	def __init__(self, seed, size, vertices = None):
+		rng = random.Random(seed)
+		count = vertices or sett.COASTLINE_VERTICES
+		angles = np.linspace(0, 2 * math.pi, count, endpoint = False)
+		#A few low harmonics give bays and headlands without spikes
+		radii = np.ones(count)
+		for harmonic in range(2, 7):
+			radii += rng.uniform(0, sett.COASTLINE_ROUGHNESS / harmonic) * np.sin(harmonic * angles + rng.uniform(0, 2 * math.pi))
+		radii *= size / radii.max()
+		self.radii = radii.astype(np.float32)
+		self.seed = seed
+		self.size = size
+		self.vertices = np.column_stack((np.cos(angles) * radii, np.sin(angles) * radii)).astype(np.float32)
+
+	def contact(self, x0, y0, x1, y1, t, padding = 0):
+		#First point of the move (relative to the center) past the shore, given where it entered the bounding circle
+		samples = np.linspace(t, 1, 33)
+		x = x0 + (x1 - x0) * samples
+		y = y0 + (y1 - y0) * samples
+		inside = np.hypot(x, y) <= self.radius_at(np.arctan2(y, x)) + padding
+		if inside[0]:
+			if t > 0 or x0 * (x1 - x0) + y0 * (y1 - y0) <= 0:
+				return t
+			#Already over the shore but heading out, only a fresh landfall further on counts
+			outside = np.flatnonzero(~inside)
+			if not len(outside):
+				return None
+			inside[:outside[0]] = False
+		landfall = np.flatnonzero(inside)
+		if not len(landfall):
+			return None
+		#Bisect between the last sample outside and the first inside
+		low, high = samples[landfall[0] - 1], samples[landfall[0]]
+		for _ in range(8):
+			middle = (low + high) / 2
+			x, y = x0 + (x1 - x0) * middle, y0 + (y1 - y0) * middle
+			if math.hypot(x, y) <= self.radius_at(math.atan2(y, x)) + padding:
+				high = middle
+			else:
+				low = middle
+		return float(high)
+
+	def get_sprite(self, radius, colors):
+		#Rasterised once per on-screen radius, coarser outlines for smaller ones
+		step = self.lod_step(radius)
+		return sprite_cache.get(("coastline", self.seed, self.size, radius, step, colors), lambda: self.render(radius, step, colors))
+
+	def lod_step(self, radius):
+		#Every step-th vertex, about one per COASTLINE_LOD_PIXELS of radius
+		step = 1
+		while step * 2 <= len(self.vertices) // 8 and len(self.vertices) // (step * 2) * sett.COASTLINE_LOD_PIXELS >= radius:
+			step *= 2
+		return step
+
+	def radius_at(self, angle):
+		#Shore distance from the center at an angle (radians), linear between vertices
+		count = len(self.radii)
+		position = np.mod(angle, 2 * math.pi) / (2 * math.pi) * count
+		index = np.floor(position).astype(int) % count
+		fraction = position - np.floor(position)
+		return self.radii[index] * (1 - fraction) + self.radii[(index + 1) % count] * fraction
+
+	def render(self, radius, step, colors):
+		#colors: (beach, land), the land inset from the shore by a sandy rim
+		surface = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+		center = radius
+		outline = self.vertices[::step] * (radius / self.size)
+		for color, scale in zip(colors, (1, 0.92)):
+			pygame.draw.polygon(surface, color, (outline * scale + center).tolist())
+		return surface
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def entry_times(x0, y0, x1, y1, obstacles, padding = 0):
+	#Fraction of the move at which a point moving from (x0, y0) to (x1, y1) enters each bounding circle
+	#(radius size + padding), 0 if it starts inside, inf if it misses. All candidates tested at once.
+	count = len(obstacles)
+	cx = np.fromiter((obstacle.x for obstacle in obstacles), float, count)
+	cy = np.fromiter((obstacle.y for obstacle in obstacles), float, count)
+	radius = np.fromiter((obstacle.size for obstacle in obstacles), float, count) + padding
+
+	#|start + t * move - center|² = radius², solved for the smaller t
+	dx, dy = x1 - x0, y1 - y0
+	fx, fy = x0 - cx, y0 - cy
+	a = dx * dx + dy * dy
+	b = 2 * (fx * dx + fy * dy)
+	c = fx * fx + fy * fy - radius * radius
+	t = np.full(count, np.inf)
+	t[c <= 0] = 0
+	if a > 0:
+		disc = b * b - 4 * a * c
+		ahead = (c > 0) & (disc >= 0)
+		entry = (-b[ahead] - np.sqrt(disc[ahead])) / (2 * a)
+		t[ahead] = np.where((entry >= 0) & (entry <= 1), entry, np.inf)
+	return t
+
+
+def sweep(x0, y0, x1, y1, obstacles, padding = 0):
+	#First of the obstacles the move runs into, as (obstacle, fraction of the move at impact) or (None, 1).
+	#Bounding circles narrow it down, each obstacle's contact() has the final say on its own shape.
+	if not obstacles:
+		return None, 1
+	t = entry_times(x0, y0, x1, y1, obstacles, padding)
+	for index in np.argsort(t).tolist():
+		if t[index] == np.inf:
+			break
+		contact = obstacles[index].contact(x0, y0, x1, y1, float(t[index]), padding)
+		if contact is not None:
+			return obstacles[index], contact
+	return None, 1
+
+
+def sweep_bounds(x0, y0, x1, y1, padding = 0):
+	#Box around the move for a grid query
+	return min(x0, x1) - padding, min(y0, y1) - padding, max(x0, x1) + padding, max(y0, y1) + padding
@@ -0,0 +1,229 @@
+import math
+import numpy as np
+
+import settings as sett
+
+from objects import Vessel
+from polar import get_polar
+from stores import EntityStore
+
+
+class Fleet(EntityStore):
+	#NPC boats sailing between islands. Same sailing model and SAIL_* settings as Boat.apply_wind and Boat.move, run for
+	#every due boat at once.
+	fields = (
+		("x", np.float64),
+		("y", np.float64),
+		("orientation", np.float64),
+		("speed", np.float64),
+		("angular_velocity", np.float64),
+		("rudder", np.float64),
+		("sail", np.float64),
+		("reef", np.float64),
+		("cruise_reef", np.float64),
+		("target_x", np.float64),
+		("target_y", np.float64),
+		("target_radius", np.float64),  #Negative while the boat has nowhere to go
+		("moored_until", np.int64),
+		("steered", np.float64),  #When the autopilot last set the helm (ms)
+		("clearance", np.float64),  #Distance to the nearest obstacle when it did, less the distance sailed since
+		("updated", np.float64),
+		("paint", np.int64),
+	)
+	defaults = {"updated": np.nan}
+	size = 14
+	update_cost = 4
+
+	def __init__(self, seed = None):
+		super().__init__(seed)
+		self.polar = get_polar(sett.FLEET_POLAR)
+
+	def launch(self, chunk, rng, count, chunk_size, time):
+		#Boats for a newly loaded chunk, moored off its islands (or anywhere clear of its rocks) for a few seconds first
+		positions = []
+		for _ in range(count):
+			for _ in range(10):
+				if chunk.islands:
+					island = rng.choice(chunk.islands)
+					angle = rng.uniform(0, 2 * math.pi)
+					distance = island.size + rng.uniform(100, 300)
+					x, y = island.x + math.cos(angle) * distance, island.y + math.sin(angle) * distance
+				else:
+					x, y = (chunk.cx + rng.random()) * chunk_size, (chunk.cy + rng.random()) * chunk_size
+				if all(math.hypot(x - rock.x, y - rock.y) > rock.size + self.size * 2 for rock in chunk.rocks):
+					positions.append((x, y))
+					break
+		if not positions:
+			return []
+		x, y = zip(*positions)
+		count = len(positions)
+		return self.append(count, Vessel,
+			x = x,
+			y = y,
+			orientation = [rng.uniform(0, 360) for _ in range(count)],
+			cruise_reef = [rng.uniform(0.5, 1) for _ in range(count)],
+			target_radius = -1,
+			steered = -math.inf,
+			moored_until = [time + rng.randint(0, 5000) for _ in range(count)],
+			paint = [rng.randrange(len(sett.FLEET_COLORS)) for _ in range(count)],
+		)
+
+	def forget_targets(self, islands):
+		#Boats bound for islands that have been unloaded pick somewhere else
+		loaded = {(island.x, island.y) for island in islands}
+		for index in np.flatnonzero(self.target_radius >= 0).tolist():
+			if (self.target_x[index], self.target_y[index]) not in loaded:
+				self.target_radius[index] = -1
+
+	def obstacles(self, index, grids, reach):
+		#What each boat in index could run into within reach: (x, y, radius + boat size), a row per boat.
+		#Boats are grouped by grid cell and only see the obstacles in the grid cells around theirs. Rows with fewer
+		#are padded with obstacles far out of reach, and one can turn up more than once, neither changes the nearest.
+		size = grids[0].cell_size
+		cells = {}
+		for row, cell in enumerate(zip(np.floor(self.x[index] / size).astype(int).tolist(), np.floor(self.y[index] / size).astype(int).tolist())):
+			cells.setdefault(cell, []).append(row)
+		found = []
+		for (cx, cy), rows in cells.items():
+			bounds = (cx * size - reach, cy * size - reach, (cx + 1) * size + reach, (cy + 1) * size + reach)
+			arrays = [array for grid in grids for array in grid.cell_arrays(*bounds)]
+			found.append((rows, np.concatenate(arrays) if arrays else np.zeros((0, 3))))
+		width = max(len(near) for _, near in found)
+		ox, oy = np.full((len(index), width), 1e12), np.full((len(index), width), 1e12)
+		radius = np.zeros((len(index), width))
+		for rows, near in found:
+			count = len(near)
+			ox[rows, :count], oy[rows, :count], radius[rows, :count] = near[:, 0], near[:, 1], near[:, 2]
+		return ox, oy, radius + self.size
+
+	def pick_targets(self, index, islands):
+		#One of the three nearest islands, not the one just visited
+		for row in index.tolist():
+			x, y = self.x[row], self.y[row]
+			choices = sorted((island for island in islands if (island.x, island.y) != (self.target_x[row], self.target_y[row])),
+				key = lambda island: (island.x - x) ** 2 + (island.y - y) ** 2)[:3]
+			if not choices:
+				continue
+			island = choices[self.rng.integers(len(choices))]
+			self.target_x[row], self.target_y[row], self.target_radius[row] = island.x, island.y, island.size
+
+	def sail_many(self, index, dt, direction, speed):
+		#Boat.apply_wind and Boat.move for the boats in index, each with its own dt and wind
+		polar = self.polar
+		orientation = self.orientation[index]
+		reef = self.reef[index]
+		drive = polar.drive_many(direction - orientation, self.sail[index], reef)
+		target_speed = np.minimum(speed * sett.SAIL_WIND_PUSH * drive, polar.max_speed(reef)) * polar.speed_multiplier
+
+		#Smoothly adjust, then drag
+		boat_speed = self.speed[index]
+		boat_speed = np.where(boat_speed < target_speed, np.minimum(boat_speed + sett.SAIL_ACCELERATION * dt, target_speed),
+			np.maximum(boat_speed - sett.SAIL_DECELERATION * dt, target_speed))
+		boat_speed = np.maximum(0, boat_speed * (1 - sett.SAIL_DRAG * dt))
+
+		#Rudder, then wind drift
+		angular_velocity = self.angular_velocity[index]
+		angular_velocity += (self.rudder[index] * sett.SAIL_TURN_RATE / (1 + boat_speed) - angular_velocity) * np.minimum(1, sett.SAIL_HELM_RESPONSE * dt)
+		orientation = (orientation + angular_velocity * dt) % 360
+		orientation += ((direction - orientation + 180) % 360 - 180) * sett.SAIL_WEATHERVANE * dt
+
+		rad = np.radians(orientation)
+		self.x[index] += np.sin(rad) * boat_speed * dt * sett.SAIL_DISTANCE_SCALE
+		self.y[index] -= np.cos(rad) * boat_speed * dt * sett.SAIL_DISTANCE_SCALE
+		self.orientation[index] = orientation
+		self.angular_velocity[index] = angular_velocity
+		self.speed[index] = boat_speed
+
+	def steer(self, index, direction, grids):
+		#Autopilot: head for the target, clear of anything in the way, never pointing where the sails can't drive
+		x, y = self.x[index], self.y[index]
+		orientation = self.orientation[index]
+		dx, dy = self.target_x[index] - x, self.target_y[index] - y
+		desired = np.degrees(np.arctan2(dx, -dy)) % 360
+
+		#Upwind or dead downwind: hold the nearest workable heading on the current tack until the target comes free
+		relative = (direction - desired) % 360
+		bow = (relative > 310) | (relative < 50)
+		stern = (relative > 130) & (relative < 230)
+		low, high = np.where(bow, 310, 130), np.where(bow, 50, 230)
+		current = (direction - orientation) % 360
+		nearer_low = np.abs((current - low + 180) % 360 - 180) < np.abs((current - high + 180) % 360 - 180)
+		relative = np.where(bow | stern, np.where(nearer_low, low, high), relative)
+		desired = (direction - relative) % 360
+
+		#The nearest obstacle within the lookahead across the bow: turn away from it
+		lookahead = sett.FLEET_LOOKAHEAD
+		ox, oy, radius = self.obstacles(index, grids, lookahead)
+		self.clearance[index] = lookahead
+		if ox.shape[1]:
+			rad = np.radians(orientation)[:, None]
+			rel_x, rel_y = ox - x[:, None], oy - y[:, None]
+			self.clearance[index] = np.minimum(lookahead, (np.hypot(rel_x, rel_y) - radius).min(axis = 1))
+			ahead = rel_x * np.sin(rad) - rel_y * np.cos(rad)
+			right = rel_x * np.cos(rad) + rel_y * np.sin(rad)
+			bound = (ox == self.target_x[index, None]) & (oy == self.target_y[index, None])
+			threat = (ahead > -radius) & (ahead < lookahead + radius) & (np.abs(right) < radius) & ~bound
+			nearest = np.where(threat, ahead, np.inf).argmin(axis = 1)
+			turn = np.where(right[np.arange(len(index)), nearest] > 0, -60, 60)
+			desired = np.where(threat.any(axis = 1), (orientation + turn) % 360, desired)
+
+		self.rudder[index] = np.clip((desired - orientation + 180) % 360 - 180, -30, 30)
+		self.sail[index] = self.polar.best_sail(direction - orientation)
+		#Ease off approaching the island
+		distance = np.hypot(dx, dy) - self.target_radius[index]
+		self.reef[index] = np.clip(distance / (2 * lookahead), 0.4, 1) * self.cruise_reef[index]
+
+	def update(self, index, dt, time, direction, speed, islands, grids):
+		#Steps the boats in index by their own dt (see lod.py). direction and speed: the wind at each of them.
+		#grids: spatial grids of what to steer clear of
+		if not len(index):
+			return
+		moored = self.moored_until[index] > time
+		self.speed[index[moored]] = 0
+		leaving = index[~moored & (self.target_radius[index] < 0)]
+		if len(leaving):
+			self.pick_targets(leaving, islands)
+		sailing = ~moored & (self.target_radius[index] >= 0)
+		index, dt, direction, speed = index[sailing], dt[sailing], direction[sailing], speed[sailing]
+		if not len(index):
+			return
+		#The autopilot only needs to look around a few times a second
+		due = time - self.steered[index] >= sett.FLEET_AUTOPILOT_INTERVAL
+		helm = index[due]
+		if len(helm):
+			self.steered[helm] = time
+			self.steer(helm, direction[due], grids)
+		self.sail_many(index, dt, direction, speed)
+
+		#Only boats that may have closed the gap to something since the helm last looked around are checked.
+		#Those that hit are pushed back out of it and stopped dead.
+		self.clearance[index] -= self.speed[index] * dt * sett.SAIL_DISTANCE_SCALE
+		close = index[self.clearance[index] <= 0]
+		#Reaching out by the hull, the overlap below counts the boat's size as well as the obstacle's
+		if len(close):
+			ox, oy, radius = self.obstacles(close, grids, self.size)
+			rel_x, rel_y = self.x[close, None] - ox, self.y[close, None] - oy
+			distance = np.hypot(rel_x, rel_y)
+			overlap = distance < radius
+			hit = np.flatnonzero(overlap.any(axis = 1))
+			if len(hit):
+				nearest = np.where(overlap[hit], distance[hit], np.inf).argmin(axis = 1)
+				scale = radius[hit, nearest] / np.maximum(distance[hit, nearest], 1e-6)
+				self.x[close[hit]] = ox[hit, nearest] + rel_x[hit, nearest] * scale
+				self.y[close[hit]] = oy[hit, nearest] + rel_y[hit, nearest] * scale
+				self.speed[close[hit]] = 0
+
+		#Arrived: moor a while, then choose the next island
+		arrived = index[np.hypot(self.target_x[index] - self.x[index], self.target_y[index] - self.y[index]) <= self.target_radius[index] + 3 * self.size + 60]
+		if len(arrived):
+			self.moored_until[arrived] = time + self.rng.integers(5000, 20000, len(arrived))
+			self.speed[arrived] = 0
+			self.target_radius[arrived] = -1
+
+	def prune(self, chunks):
+		#Boats outside the loaded chunks go with them
+		size = chunks.chunk_size
+		cells = zip(np.floor(self.x / size).astype(int).tolist(), np.floor(self.y / size).astype(int).tolist())
+		gone = [view for view, cell in zip(self.views, cells) if cell not in chunks.chunks]
+		if gone:
+			self.remove(gone)
@@ -0,0 +1,59 @@
+import numpy as np
+
+import settings as sett
+
+
+class LODScheduler:
+	#Decides which rows of the scheduled stores step each physics step. By distance from the screen center a row is in
+	#the full band (every step), the reduced band (every LOD_REDUCED_INTERVAL steps) or dormant (not at all). A row steps
+	#by all the time since it last did, up to LOD_MAX_CATCH_UP, so a dormant one catches up in one go when it's back in range.
+	#Each store has an update_cost per row, at most LOD_BUDGET is spent a frame, shared evenly by the frame's steps
+	#(see begin_frame): the most overdue rows first, the rest wait.
+	#Scheduled stores keep the time each row was stepped up to in an "updated" column, NaN for rows not seen yet.
+	def __init__(self, stores, budget = None):
+		self.budget = budget or sett.LOD_BUDGET
+		self.clock = 0  #ms, this scheduler's own, advanced by every plan
+		self.deferred = 0  #Rows due last step that the budget pushed back
+		self.step_budget = self.budget  #All of it for steps run outside a frame
+		self.stores = stores
+
+	def begin_frame(self, steps):
+		#The frame about to run this many steps
+		self.step_budget = self.budget / max(1, steps)
+
+	def plan(self, dt, center_x, center_y):
+		#{store: (rows, seconds each of them steps)} for the step of dt seconds about to run
+		step = dt * 1000
+		end = self.clock + step
+		candidates = []
+		for store in self.stores:
+			updated = store.updated
+			updated[np.isnan(updated)] = self.clock
+			distance = (store.x - center_x) ** 2 + (store.y - center_y) ** 2
+			full = distance <= sett.LOD_FULL_RADIUS ** 2
+			reduced = ~full & (distance <= sett.LOD_REDUCED_RADIUS ** 2)
+			#Steps' worth of time owed, over the band's interval
+			overdue = (end - updated) / (np.where(full, 1, sett.LOD_REDUCED_INTERVAL) * step)
+			rows = np.flatnonzero((full | reduced) & (overdue > 0.999))
+			#Near rows ahead of far ones owed as much
+			candidates.append((store, rows, overdue[rows] + full[rows]))
+
+		self.deferred = 0
+		if sum(store.update_cost * len(rows) for store, rows, _ in candidates) > self.step_budget:
+			priority = np.concatenate([priority for _, _, priority in candidates])
+			cost = np.concatenate([np.full(len(rows), store.update_cost) for store, rows, _ in candidates])
+			order = np.argsort(-priority, kind = "stable")
+			keep = np.zeros(len(priority), bool)
+			keep[order[np.cumsum(cost[order]) <= self.step_budget]] = True
+			self.deferred = int(len(keep) - keep.sum())
+			start = 0
+			for number, (store, rows, priority) in enumerate(candidates):
+				candidates[number] = (store, rows[keep[start:start + len(rows)]], priority)
+				start += len(rows)
+
+		plan = {}
+		for store, rows, _ in candidates:
+			plan[store] = (rows, np.minimum(end - store.updated[rows], sett.LOD_MAX_CATCH_UP) / 1000)
+			store.updated[rows] = end
+		self.clock = end
+		return plan
@@ -1,17 +1,27 @@
 
+import json
 import os
 import pygame
-import random
 import sys
+import time
 
 import settings as sett
 
-from objects import Boat, Cloud, Island, Rock, Seagull, Wind
-from utils import Button, bounce_back, display_info, draw_wind_rose, get_stop_btns, load_game, render_multiline, save_game
+from minimap import Minimap
+from music import MusicPlayer
+from profiler import Profiler, export_trace
+from renderer import Renderer
+from scenes import TextScene, TitleScene
+from simulation import Simulation, SimulationThread
+from utils import BackgroundTask, display_info, draw_wind_rose, get_font, get_save_path, get_stop_btns, load_game, save_game, text_cache
+from world import World
 
 
-pygame.init()
-pygame.mixer.init()
+STARTED = time.perf_counter()  #Once the modules above are imported, startup times count from here
+
+
+def init_audio(task = None):
+	pygame.mixer.init()
 
 
 def resource_path(relative_path):
@@ -21,54 +31,138 @@ def resource_path(relative_path):
 
 
 class DevTools:
-	def __init__(self, clock):
+	#FPS counter, with F3 the profiler's frame time graph and rolling span timings and counts under it
+	def __init__(self, clock, profiler):
 		self.clock = clock
-		
+		self.overlay = False
+		self.panel = None
+		self.panel_time = 0
+		self.profiler = profiler
+		self.status = None  #Trace export progress
+
+	def toggle_overlay(self):
+		self.overlay = not self.overlay
+		self.panel = None
+
 	def draw_debug(self, screen):
-		font = pygame.font.Font(None, 25)
-		text_surface = font.render("FPS: " + str(round(self.clock.get_fps(), 1)), True, sett.colors["WHITE"])
-		screen.blit(text_surface, (sett.WIDTH // 1.2, sett.HEIGHT // 100))
+		font = get_font(25)
+		text_surface = text_cache.render(font, "FPS: " + str(round(self.clock.get_fps(), 1)), sett.colors["WHITE"])
+		rects = [screen.blit(text_surface, (sett.WIDTH // 1.2, sett.HEIGHT // 100))]
+		top = rects[0].bottom + 5
+		if self.status:
+			status_surface = text_cache.render(font, self.status, sett.colors["WHITE"])
+			rects.append(screen.blit(status_surface, (sett.WIDTH - status_surface.get_width() - 10, top)))
+			top = rects[-1].bottom + 5
+		if self.overlay:
+			#Numbers that change every frame can't be read anyway, the panel is redrawn a few times a second
+			now = pygame.time.get_ticks()
+			if self.panel is None or now - self.panel_time >= sett.PROFILER_REFRESH:
+				self.panel = self.draw_panel()
+				self.panel_time = now
+			rects.append(screen.blit(self.panel, (sett.WIDTH - self.panel.get_width() - 10, top)))
+		return rects[0].unionall(rects[1:])
+
+	def draw_panel(self):
+		times, spans, counts = self.profiler.rolling()
+		font = get_font(20)
+		line = font.get_linesize()
+		width, graph_height = sett.PROFILER_FRAMES * 2, 80
+		rows = 3 + len(spans) + len(counts)
+		panel = pygame.Surface((width, graph_height + 10 + rows * line), pygame.SRCALPHA)
+		panel.fill((0, 0, 0, 160))
+
+		#One bar per frame, the budget halfway up, hitches in red with a marker above
+		scale = graph_height / (2 * sett.PROFILER_BUDGET_MS)
+		left = width - 2 * len(times)
+		for number, ms in enumerate(times):
+			height = min(graph_height, max(1, int(ms * scale)))
+			hitch = ms > sett.PROFILER_HITCH_MS
+			color = sett.colors["RED"] if hitch else sett.colors["SAND"] if ms > sett.PROFILER_BUDGET_MS else sett.colors["GREEN"]
+			x = left + number * 2
+			pygame.draw.line(panel, color, (x, graph_height), (x, graph_height - height), 2)
+			if hitch:
+				pygame.draw.polygon(panel, sett.colors["RED"], [(x - 3, 0), (x + 3, 0), (x, 5)])
+		budget_y = graph_height - int(sett.PROFILER_BUDGET_MS * scale)
+		pygame.draw.line(panel, sett.colors["WHITE"], (0, budget_y), (width, budget_y))
+
+		#Rolling means per frame, spans in the order they first ran
+		mean = sum(times) / len(times) if times else 0
+		hitches = sum(ms > sett.PROFILER_HITCH_MS for ms in times)
+		lines = [(f"Frame {mean:.2f} ms, worst {max(times, default = 0):.2f} ms, {hitches} hitches", "", ""), ("Span", "mean ms", "max ms")]
+		lines += [(name, f"{span_mean:.2f}", f"{span_max:.2f}") for name, (span_mean, span_max) in spans.items()]
+		lines += [("Count", "per frame", "")] + [(name, f"{value:.0f}", "") for name, value in counts.items()]
+		for number, columns in enumerate(lines):
+			y = graph_height + 5 + number * line
+			for x, text in zip((5, width - 160, width - 80), columns):
+				if text:
+					panel.blit(font.render(text, True, sett.colors["WHITE"]), (x, y))
+		return panel
 
 
 class Game:
 	def __init__(self):
+		#The window and a first frame before anything else. Fonts, scenes and sprites are built when first needed,
+		#the mixer opens on a worker and the music starts once it has.
+		pygame.display.init()
+		#Starts SDL's timer for get_ticks, as pygame.init() would without opening the audio device
+		pygame.time.wait(0)
 		info = pygame.display.Info()
 		sett.set_display(info)
+		self.screen = pygame.display.set_mode((sett.WIDTH, sett.HEIGHT))
+		self.draw_sea(self.screen)
+		pygame.display.flip()
+		self.startup = {}  #ms from STARTED to each milestone
+		self.mark_startup("first_frame")
+
 		self.buttons = []
 		self.clock = pygame.time.Clock()
 		self.game_running = False
 		self.load_data = False
 		self.running = True
-		self.screen = pygame.display.set_mode((sett.WIDTH, sett.HEIGHT))
+		self.profiler = Profiler(frames = sett.PROFILER_FRAMES, trace_events = sett.PROFILER_TRACE_EVENTS)
+		self.renderer = Renderer(self.screen, self.profiler)
+		self.dev = DevTools(self.clock, self.profiler)
 
-		#Cache fonts
-		self.font_small = pygame.font.Font(None, int(sett.HEIGHT * 0.02))
-		self.font_large = pygame.font.Font(None, int(sett.HEIGHT * 0.1))
-		self.font_debug = pygame.font.Font(None, 25)
-
-		#State setup
+		#State setup, the menu screens are built once and kept
+		self.scenes = {
+			"CREDITS" : TextScene(self, "CREDITS", sett.credit_text),
+			"HOWTOPLAY" : TextScene(self, "HOWTOPLAY", sett.howtoplay_text),
+			"MAIN_MENU" : TitleScene(self, "MAIN_MENU"),
+		}
 		self.state_dict = {
-			"CREDITS" : self.credits,
+			"CREDITS" : self.scenes["CREDITS"].run,
 			"EXIT" : self.exit_game,
-			"HOWTOPLAY" : self.how_to_play,
-			"MAIN_MENU" : self.main_menu,
+			"HOWTOPLAY" : self.scenes["HOWTOPLAY"].run,
+			"MAIN_MENU" : self.scenes["MAIN_MENU"].run,
 			"NEW_GAME" : self.new_game,
 		}
 		self.state = "MAIN_MENU"
 		
-		self.playlist = [
+		self.MUSIC_END = pygame.USEREVENT + 1
+		self.SAVE_DONE = pygame.USEREVENT + 2
+		self.LOAD_DONE = pygame.USEREVENT + 3
+		self.TRACE_DONE = pygame.USEREVENT + 4
+		self.MUSIC_READY = pygame.USEREVENT + 5
+		self.AUDIO_READY = pygame.USEREVENT + 6
+		self.docked_island = None
+		self.load_status = None  #Why the last load failed, shown on the main menu
+		self.load_task = None
+		self.save_status = None
+		self.save_task = None
+		self.simulation = None
+		self.stop_buttons = None
+		self.trace_task = None
+		playlist = [
 		"Assets/Calm Waters.mp3",
 		"Assets/Waves of Freedom.mp3",
 		"Assets/Drift on the Horizon.mp3",
 		"Assets/Sailing the Digital Tides.mp3",
 		]
-		random.shuffle(self.playlist)
-		self.current_track = 0
-		self.MUSIC_END = pygame.USEREVENT + 1
-		pygame.mixer.music.set_endevent(self.MUSIC_END)
-		pygame.mixer.music.load(resource_path(self.playlist[0]))
-		pygame.mixer.music.play()
+		self.music = MusicPlayer([resource_path(path) for path in playlist], self.MUSIC_END, self.MUSIC_READY)
+		self.audio_task = BackgroundTask(self.AUDIO_READY, init_audio)
+		self.audio_task.start()
 		
+		self.held = {}
 		self.mouse_held = False
 		self.mouse_pos = None
 
@@ -78,11 +172,17 @@ class Game:
 		self.rudder_rect = pygame.Rect(0.35 * sett.WIDTH, sett.HEIGHT - control_height, 0.25 * sett.WIDTH, control_height)
 		self.reef_rect = pygame.Rect(0.65 * sett.WIDTH, sett.HEIGHT - control_height, 0.25 * sett.WIDTH, control_height)
 		
-		self.boat = None
-		self.wind = None
-		
-		self.islands = []
-		self.rocks = []
+		self.minimap = None
+		self.show_minimap = True
+		self.world = None
+
+	@property
+	def font_large(self):
+		return get_font(int(sett.HEIGHT * 0.1))
+
+	@property
+	def font_small(self):
+		return get_font(int(sett.HEIGHT * 0.02))
 
 	def exit_game(self):
 		if self.state == "EXIT":
@@ -95,6 +195,10 @@ class Game:
 			self.game_running = False
 			self.state = "EXIT"
 
+	def control(self, action, *args):
+		#Boat input goes through the simulation, which may be stepping it on another thread
+		self.simulation.send(lambda world: getattr(world.boat, action)(*args))
+
 	def handle_button_click(self, pos):
 		for button in self.buttons:
 			if button.is_clicked(pos) and button.is_active(self.state):
@@ -122,13 +226,19 @@ class Game:
 				elif button.text == "Exit":
 					self.exit_game()
 
-	def handle_events(self, boat=None, stop_buttons=None):
-		for event in pygame.event.get():
+	def handle_events(self, boat=None, stop_buttons=None, events=None):
+		for event in pygame.event.get() if events is None else events:
 			if event.type == pygame.QUIT:
 				self.exit_game()
 			elif event.type == pygame.KEYDOWN:
 				if event.key == pygame.K_ESCAPE:
 					self.exit_game()
+				elif event.key == pygame.K_F3 and self.state == "NEW_GAME":
+					self.dev.toggle_overlay()
+				elif event.key == pygame.K_F4 and self.state == "NEW_GAME":
+					self.save_trace()
+				elif event.key == pygame.K_m and self.state == "NEW_GAME":
+					self.show_minimap = not self.show_minimap
 			elif event.type == pygame.MOUSEBUTTONDOWN:
 				self.mouse_held = True
 				self.mouse_pos = event.pos
@@ -138,17 +248,14 @@ class Game:
 					for btn in stop_buttons:
 						if btn.rect.collidepoint(event.pos):
 							if btn.text == "Set Sail":
-								boat.release()
+								self.control("release")
+								self.save_status = None
 							elif btn.text == "Save":
-								self.boat.surface = None
-								surface = self.boat.island.island_name_surface
-								self.boat.island_name_surface = None
-								for island in self.islands:
-									island.surface = None
-								for rock in self.rocks:
-									rock.surface = None
-								save_game(boat = boat, islands = self.islands, rocks = self.rocks, wind = self.wind)
-								self.boat.island.island_name_surface = surface
+								if not (self.save_task and self.save_task.is_alive()):
+									#Snapshot now, pack and write on a worker
+									self.save_task = BackgroundTask(self.SAVE_DONE, save_game, self.simulation.call(lambda world: world.snapshot()))
+									self.save_task.start()
+									self.save_status = self.font_small.render("Saving...", True, sett.colors["WHITE"])
 							elif btn.text == "Exit":
 								self.exit_game()
 							return  #Stop further processing this click
@@ -159,191 +266,168 @@ class Game:
 			elif event.type == pygame.MOUSEBUTTONUP:
 				self.mouse_held = False
 				
-			elif event.type == self.MUSIC_END:
-				self.current_track = (self.current_track + 1) % len(self.playlist)
-				pygame.mixer.music.load(resource_path(self.playlist[self.current_track]))
-				pygame.mixer.music.play()
-
-		#Held adjustments for normal controls
-		if self.state == "NEW_GAME" and boat and getattr(self, "mouse_held", False) and not boat.stopped:
-			if self.sail_rect.collidepoint(self.mouse_pos):
-				boat.adjust_sail(0.5 if self.mouse_pos[0] < self.sail_rect.centerx else -0.5)
-			elif self.rudder_rect.collidepoint(self.mouse_pos):
-				boat.adjust_rudder(0.05 if self.mouse_pos[0] < self.rudder_rect.centerx else -0.05)
-			elif self.reef_rect.collidepoint(self.mouse_pos):
-				boat.adjust_reef(0.05 if self.mouse_pos[0] < self.reef_rect.centerx else -0.05)
+			elif event.type == self.SAVE_DONE:
+				self.save_status = self.font_small.render("Save failed" if event.error else "Saved", True, sett.colors["WHITE"])
+
+			elif event.type == self.TRACE_DONE:
+				self.dev.status = "Trace export failed" if event.error else "Trace saved to " + event.result
+
+			elif event.type == self.LOAD_DONE:
+				if event.task is self.load_task:
+					self.finish_load(event)
 				
-		#Held adjustments for keyboard controls
-		keys = pygame.key.get_pressed()
+			elif event.type == self.AUDIO_READY:
+				#Without a sound device the game carries on silent
+				if not event.error:
+					self.mark_startup("audio")
+					self.music.start()
+
+			elif event.type in (self.MUSIC_END, self.MUSIC_READY):
+				self.music.handle_event(event)
+				if self.music.current >= 0:
+					self.mark_startup("music")
+
+		#Held controls: which way each is being pushed. The world applies them every physics step, so how fast the
+		#boat trims and steers doesn't depend on the frame rate. Only changes are sent.
+		held = {}
 		if self.state == "NEW_GAME" and boat and not boat.stopped:
-			#Sail angle (Q/E)
-			if keys[pygame.K_q]:
-				boat.adjust_sail(0.5)
-			if keys[pygame.K_e]:
-				boat.adjust_sail(-0.5)
-			#Rudder (A/D)
-			if keys[pygame.K_a]:
-				boat.adjust_rudder(0.05)
-			if keys[pygame.K_d]:
-				boat.adjust_rudder(-0.05)
-			#Reef (W/S)
-			if keys[pygame.K_w]:
-				boat.adjust_reef(0.05)
-			if keys[pygame.K_s]:
-				boat.adjust_reef(-0.05)
-
-	def credits(self):
-		if not self.buttons:
-			scale_width = sett.WIDTH // 10
-			scale_height = sett.HEIGHT // 20
-			self.buttons = [Button("Main Menu", (sett.WIDTH // 2 - scale_width, int(sett.HEIGHT // 1.2)),
-				scale_width * 2, scale_height // 2, sett.HEIGHT)]
+			#Pads
+			if self.mouse_held:
+				for rect, action in ((self.sail_rect, "adjust_sail"), (self.rudder_rect, "adjust_rudder"), (self.reef_rect, "adjust_reef")):
+					if rect.collidepoint(self.mouse_pos):
+						held[action] = 1 if self.mouse_pos[0] < rect.centerx else -1
+						break
+			#Sail angle (Q/E), rudder (A/D), reef (W/S)
+			keys = pygame.key.get_pressed()
+			for key, action, direction in ((pygame.K_q, "adjust_sail", 1), (pygame.K_e, "adjust_sail", -1),
+				(pygame.K_a, "adjust_rudder", 1), (pygame.K_d, "adjust_rudder", -1),
+				(pygame.K_w, "adjust_reef", 1), (pygame.K_s, "adjust_reef", -1)):
+				if keys[key]:
+					held[action] = held.get(action, 0) + direction
+		if held != self.held and self.simulation:
+			self.held = held
+			self.simulation.send(lambda world: world.hold(held))
 
-		self.screen.fill(sett.colors["LIGHT BLUE"])
-		render_multiline(self.screen, sett.credit_text, self.font_small, sett.colors["WHITE"])
-		self.handle_events()
-		for button in self.buttons:
-			button.draw(self.screen)
-		pygame.display.flip()
-		
-	def how_to_play(self):
-		if not self.buttons:
-			scale_width = sett.WIDTH // 10
-			scale_height = sett.HEIGHT // 20
-			self.buttons = [Button("Main Menu", (sett.WIDTH // 2 - scale_width, int(sett.HEIGHT // 1.2)),
-				scale_width * 2, scale_height // 2, sett.HEIGHT)]
+	def draw_game_ui(self, surface, boat):
+		if boat.stopped:
+			for btn in self.stop_buttons:
+				btn.draw(surface)
+			if boat.island and boat.island.island_name_surface:
+				first_button = self.stop_buttons[0]
+				name_x = sett.WIDTH // 2 - boat.island.island_name_surface.get_width() // 2
+				name_y = first_button.rect.top - int(sett.HEIGHT * 0.5)
+				surface.blit(boat.island.island_name_surface, (name_x, name_y))
+			if self.save_status:
+				save_button = self.stop_buttons[1]
+				surface.blit(self.save_status, (save_button.rect.right + 10, save_button.rect.centery - self.save_status.get_height() // 2))
+
+		#Draw the control pads
+		for rect, label in [(self.sail_rect, "Sail"), (self.rudder_rect, "Rudder"), (self.reef_rect, "Reef")]:
+			#Rectangle
+			pygame.draw.rect(surface, sett.colors["RED"], rect)
+			#Line
+			center_x = rect.centerx
+			pygame.draw.line(surface, sett.colors["WHITE"], (center_x, rect.top), (center_x, rect.bottom), 2)
+			#Label
+			label_surface = text_cache.render(self.font_small, label, sett.colors["WHITE"])
+			label_x = rect.centerx - label_surface.get_width() // 2
+			label_y = rect.top - label_surface.get_height() - 5  #5 pixels above the rect
+			surface.blit(label_surface, (label_x, label_y))
 
+	def draw_hud(self, surface, view, dev, boat_x, boat_y):
+		#The wind the boat is sailing in, not the prevailing one
+		direction, speed = view.boat_wind
+		rects = [
+			draw_wind_rose(surface, (200, 150), 30, direction, speed, self.font_small, self.font_small),
+			display_info(surface, view.boat),
+			dev.draw_debug(surface),
+		]
+		if self.show_minimap:
+			self.minimap.update(view.islands, view.rocks, boat_x, boat_y)
+			rects.append(self.minimap.draw(surface, (10, 260), boat_x, boat_y, view.boat.orientation))
+		return rects
+
+	def save_trace(self):
+		#The recorded spans are copied now and written on a worker
+		if self.trace_task and self.trace_task.is_alive():
+			return
+		self.trace_task = BackgroundTask(self.TRACE_DONE, export_trace, self.profiler.trace_snapshot(), get_save_path("polysail_trace.json"))
+		self.trace_task.start()
+		self.dev.status = "Exporting trace..."
+
+	def draw_loading(self):
+		self.renderer.invalidate()
 		self.screen.fill(sett.colors["LIGHT BLUE"])
-		render_multiline(self.screen, sett.howtoplay_text, self.font_small, sett.colors["WHITE"])
-		self.handle_events()
-		for button in self.buttons:
-			button.draw(self.screen)
-		pygame.display.flip()
+		text_surface = self.font_large.render("Loading...", True, sett.colors["WHITE"])
+		self.screen.blit(text_surface, (sett.WIDTH // 2 - text_surface.get_width() // 2, sett.HEIGHT // 3))
+		bar = pygame.Rect(sett.WIDTH // 4, sett.HEIGHT // 2, sett.WIDTH // 2, sett.HEIGHT // 35)
+		pygame.draw.rect(self.screen, sett.colors["WHITE"], bar, 2)
+		pygame.draw.rect(self.screen, sett.colors["WHITE"], (bar.x, bar.y, int(bar.width * self.load_task.progress), bar.height))
 
-	def main_menu(self):
-		sett.WORLD_WIDTH, sett.WORLD_HEIGHT = sett.WIDTH, sett.HEIGHT
-		wind = Wind()
-		clouds = []
-		self.game_running = True
-		cam_x, cam_y = 0, 0
-		for _ in range(25):
-			cloud = Cloud()
-			cloud.x = random.uniform(cam_x - sett.WORLD_WIDTH, cam_x + sett.WORLD_WIDTH)
-			cloud.y = random.uniform(cam_y - sett.WORLD_HEIGHT, cam_y + sett.WORLD_HEIGHT)
-			clouds.append(cloud)
-		if not self.buttons:
-			scale_width = sett.WIDTH // 10
-			scale_height = sett.HEIGHT // 20
-			button_texts = ["New Game", "Load Game", "How to Play", "Credits", "Exit"]
-			self.buttons = [Button(text, (sett.WIDTH // 2 - scale_width, sett.HEIGHT // 2 + i * scale_height),
-				scale_width * 2, scale_height // 2, sett.HEIGHT) for i, text in enumerate(button_texts)]
+	def finish_load(self, event):
+		self.load_task = None
+		try:
+			if event.error:
+				raise event.error
+			self.world.load_state(event.result)
+			self.start_simulation()
+		except Exception as e:
+			self.load_status = f"Load failed: {e}"
+			self.game_running = False
+			self.state = "MAIN_MENU"
 
-		while self.game_running:
-			current_time = pygame.time.get_ticks()
-			self.screen.fill(sett.colors["LIGHT BLUE"])
-			text_surface = self.font_large.render("POLYSAIL", True, sett.colors["WHITE"])
-			self.screen.blit(text_surface, (sett.WIDTH // 2 - text_surface.get_width() // 2, sett.HEIGHT // 10))
-			wind.update_wind(current_time)
-			for cloud in clouds:
-				cloud.apply_wind(wind)
-				cloud.draw(self.screen, cam_x, cam_y)
-			for button in self.buttons:
-				button.draw(self.screen)
-			self.handle_events()
-			pygame.display.flip()
+	def draw_sea(self, surface):
+		surface.fill(sett.colors["LIGHT BLUE"])
+
+	def mark_startup(self, milestone):
+		#Only the first time it's reached counts
+		self.startup.setdefault(milestone, round((time.perf_counter() - STARTED) * 1000, 1))
 
 	def new_game(self):
 		self.game_running = True
 		
-		clouds, seagulls, stop_buttons = self.setup()
-		dev = DevTools(self.clock)
+		self.setup()
+		dev = self.dev
+		profiler = self.profiler
+		profiler.reset()
 		
 		while self.game_running:
-			current_time = pygame.time.get_ticks()
-			dt = self.clock.get_time() / 1000
-			self.screen.fill(sett.colors["LIGHT BLUE"])
-		
-			cam_x, cam_y = self.boat.x - sett.WIDTH // 2, self.boat.y - sett.HEIGHT // 2
-			for cloud in clouds:
-				cloud.apply_wind(self.wind)
-			for seagull in seagulls:
-				offset_x = seagull.x - cam_x
-				offset_y = seagull.y - cam_y
-				dist_sq = offset_x**2 + offset_y**2
-				if dist_sq <= 4000**2:
-					seagull.move(dt)
-			if not self.boat.stopped:
-				for rock in self.rocks:
-					offset_x = rock.x - cam_x
-					offset_y = rock.y - cam_y
-					if not (offset_x + rock.size < 0 or offset_x - rock.size > sett.WIDTH or offset_y + rock.size < 0 or offset_y - rock.size > sett.HEIGHT):
-						if rock.check_collision(self.boat):
-							bounce_back(self.boat, rock)
-				self.boat.apply_wind(self.wind, dt)
-				self.boat.move(dt)
-				for island in self.islands:
-					offset_x = island.x - cam_x
-					offset_y = island.y - cam_y
-					if not (offset_x + island.size < 0 or offset_x - island.size > sett.WIDTH or offset_y + island.size < 0 or offset_y - island.size > sett.HEIGHT):
-						if island.check_docking(self.boat):
-							self.boat.stop_at_obstacle(island)
-							self.boat.island.island_name_surface = self.font_large.render(self.boat.island.name.capitalize(), True, sett.colors["WHITE"], sett.colors["BLUE"])
-							stop_buttons = get_stop_btns()
-						elif (self.boat.x - island.x) ** 2 + (self.boat.y - island.y) ** 2 <= island.size ** 2:
-						#Inside the island, but too fast to dock
-							bounce_back(self.boat, island)
-			
-			self.wind.update_wind(current_time)
-			
-			for rock in self.rocks:
-				offset_x = rock.x - cam_x
-				offset_y = rock.y - cam_y
-				if not (offset_x + rock.size < 0 or offset_x - rock.size > sett.WIDTH or offset_y + rock.size < 0 or offset_y - rock.size > sett.HEIGHT):
-					rock.draw(self.screen, cam_x, cam_y)
-			for island in self.islands:
-				offset_x = island.x - cam_x
-				offset_y = island.y - cam_y
-				if not (offset_x + island.size < 0 or offset_x - island.size > sett.WIDTH or offset_y + island.size < 0 or offset_y - island.size > sett.HEIGHT):
-					island.draw(self.screen, cam_x, cam_y)
-			self.boat.draw(self.screen, cam_x, cam_y)
-			for seagull in seagulls:
-				offset_x = seagull.x - cam_x
-				offset_y = seagull.y - cam_y
-				if not (offset_x + seagull.size < 0 or offset_x - seagull.size > sett.WIDTH or offset_y + seagull.size < 0 or offset_y - seagull.size > sett.HEIGHT):
-					seagull.draw(self.screen, cam_x, cam_y)
-			for cloud in clouds:
-				offset_x = cloud.x - cam_x
-				offset_y = cloud.y - cam_y
-				if not (offset_x + cloud.size < 0 or offset_x - cloud.size > sett.WIDTH or offset_y + cloud.size < 0 or offset_y - cloud.size > sett.HEIGHT):
-					cloud.draw(self.screen, cam_x, cam_y)
-			if self.boat.stopped:
-				for btn in stop_buttons:
-					btn.draw(self.screen)
-				if self.boat.island and hasattr(self.boat.island, "island_name_surface"):
-					first_button = stop_buttons[0]
-					name_x = sett.WIDTH // 2 - self.boat.island.island_name_surface.get_width() // 2
-					name_y = first_button.rect.top - int(sett.HEIGHT * 0.5)
-					self.screen.blit(self.boat.island.island_name_surface, (name_x, name_y))
-		
-			self.handle_events(self.boat, stop_buttons = stop_buttons if stop_buttons else None)
-			
-			#Draw the control pads
-			for rect, label in [(self.sail_rect, "Sail"), (self.rudder_rect, "Rudder"), (self.reef_rect, "Reef")]:
-			 #Rectangle
-			 pygame.draw.rect(self.screen, sett.colors["RED"], rect)
-			 #Line
-			 center_x = rect.centerx
-			 pygame.draw.line(self.screen, sett.colors["WHITE"], (center_x, rect.top), (center_x, rect.bottom), 2)
-			 #Label
-			 label_surface = self.font_small.render(label, True, sett.colors["WHITE"])
-			 label_x = rect.centerx - label_surface.get_width() // 2
-			 label_y = rect.top - label_surface.get_height() - 5  #5 pixels above the rect
-			 self.screen.blit(label_surface, (label_x, label_y))
-			draw_wind_rose(self.screen, (200, 150), 30, self.wind.current_direction, self.wind.current_speed, self.font_small, self.font_small)
-			display_info(self.screen, self.boat)
-			dev.draw_debug(self.screen)
-			pygame.display.flip()
-			self.clock.tick(60)
+			if self.load_task:
+				#Save is read on a worker, finish_load swaps it in on LOAD_DONE
+				self.draw_loading()
+				self.handle_events()
+				if not self.game_running:
+					self.load_task = None
+				pygame.display.flip()
+				self.clock.tick(30)
+				profiler.end_frame()
+				continue
+			#Physics in fixed steps, the frame draws alpha of the way between the last two.
+			#The view is the world itself, or the latest snapshot when it steps on a worker.
+			with profiler.span("simulation"):
+				view, alpha = self.simulation.frame(self.clock.get_time() / 1000)
+			boat = view.boat
+			if boat.island is not self.docked_island:
+				self.docked_island = boat.island
+				if boat.island:
+					boat.island.island_name_surface = self.font_large.render(boat.island.name.capitalize(), True, sett.colors["WHITE"], sett.colors["BLUE"])
+					self.stop_buttons = get_stop_btns()
+			with profiler.span("events"):
+				self.handle_events(boat, stop_buttons = self.stop_buttons)
+
+			boat_x, boat_y, _ = boat.interpolate(alpha)
+			cam_x, cam_y = boat_x - sett.WIDTH // 2, boat_y - sett.HEIGHT // 2
+			#Pads, dock buttons and island name only get repainted when one of these changes
+			self.renderer.set_ui(("NEW_GAME", boat.stopped, boat.island, self.save_status, id(self.stop_buttons)), lambda surface: self.draw_game_ui(surface, boat))
+			self.renderer.render((cam_x, cam_y),
+				lambda surface: (self.draw_sea(surface), view.draw_static(surface, cam_x, cam_y)),
+				lambda surface: view.draw_dynamic(surface, cam_x, cam_y, alpha),
+				lambda surface: self.draw_hud(surface, view, dev, boat_x, boat_y))
+			with profiler.span("wait"):
+				self.clock.tick(60)
+			profiler.end_frame()
+		if self.simulation:
+			self.simulation.stop()
 
 	def run(self):
 		while self.running:
@@ -351,60 +435,33 @@ class Game:
 			
 	def setup(self):
 		sett.WORLD_WIDTH, sett.WORLD_HEIGHT = 20000, 20000
-		clouds = []
-		seagulls = []
-		stop_buttons = None
-		for _ in range(int(sett.WORLD_HEIGHT / 200)):
-			clouds.append(Cloud())
+		self.world = World(self.profiler)
+		self.minimap = Minimap()
+		self.renderer.invalidate()
+		self.docked_island = None
+		self.held = {}
+		self.load_status = None
+		self.load_task = None
+		self.save_status = None
+		self.simulation = None
+		self.stop_buttons = None
 		if self.load_data:
 			self.load_data = False
-			try:
-				state = load_game()
-				self.boat = state["boat"]
-				self.islands = state["islands"]
-				self.boat.island.island_name_surface = self.font_large.render(self.boat.island.name.capitalize(), True, sett.colors["WHITE"], sett.colors["BLUE"])
-				for island in self.islands:
-					for _ in range(random.randint(1, 5)):
-						seagulls.append(Seagull(island.x, island.y, max_radius = 2000))
-				self.rocks = state["rocks"]
-				for rock in self.rocks:
-					for _ in range(random.randint(0, 3)):
-						seagulls.append(Seagull(rock.x, rock.y, max_radius = 700))
-				self.wind = state["wind"]
-				return clouds, seagulls, get_stop_btns()
-			except Exception as e:
-				self.game_running = False
-				self.state = "MAIN_MENU"
-				return clouds, seagulls, stop_buttons
-		self.boat = Boat(x = sett.WIDTH // 2, y = sett.HEIGHT // 2)
-		self.wind = Wind()
-		boat_x, boat_y = sett.WIDTH // 2, sett.HEIGHT // 2
-		starting_island = Island(x=boat_x, y=boat_y + 210, size=200)
-		self.islands.append(starting_island)
-		for _ in range(random.randint(1, 5)):
-				seagulls.append(Seagull(boat_x, boat_y + 210, max_radius = 2000))
-		self.rocks = []
-		min_distance = 200
-		for _ in range(int(sett.WORLD_HEIGHT / 750)):
-			x, y = random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH), random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
-			#Reject if too close to boat
-			while ((x - sett.WIDTH // 2) ** 2 + (y - sett.HEIGHT // 2) ** 2) < min_distance ** 2:
-				x, y = random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH), random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
-			self.islands.append(Island(x=x, y=y))
-			for _ in range(random.randint(1, 5)):
-				seagulls.append(Seagull(x, y, max_radius = 2000))
-		for _ in range(int(sett.WORLD_HEIGHT / 150)):
-			x, y = random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH), random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
-			#Reject if too close to boat
-			while ((x - sett.WIDTH // 2) ** 2 + (y - sett.HEIGHT // 2) ** 2) < min_distance ** 2:
-				x, y = random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH), random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
-			self.rocks.append(Rock(x=x, y=y))
-			for _ in range(random.randint(0, 3)):
-				seagulls.append(Seagull(x, y, max_radius = 700))
-		return clouds, seagulls, stop_buttons
+			self.load_task = BackgroundTask(self.LOAD_DONE, load_game)
+			self.load_task.start()
+			return
+		self.world.generate(sett.WIDTH // 2, sett.HEIGHT // 2)
+		self.start_simulation()
+
+	def start_simulation(self):
+		simulation = SimulationThread if sett.THREADED_SIMULATION else Simulation
+		self.simulation = simulation(self.world)
+		self.simulation.start()
 			
 			
 if __name__ == "__main__":
 	game = Game()
 	game.run()
+	if "--startup-report" in sys.argv:
+		print(json.dumps(game.startup, indent = 2))
 			
\ No newline at end of file
@@ -0,0 +1,71 @@
+import math
+import pygame
+
+import settings as sett
+
+
+class Minimap:
+	#Chart of the loaded islands and rocks. They're painted into a raster of the sea around the boat, MINIMAP_SCALE world
+	#units to a pixel, when their chunk loads and rubbed out when it unloads. The world has no edge, so once the boat's
+	#chunk is MINIMAP_RECENTER off the chart's center the raster is repainted centered on it. Drawing is one blit of a
+	#copy scaled to MINIMAP_SIZE, remade only after the raster changes, and the boat on top.
+	def __init__(self):
+		self.width, self.height = sett.WORLD_WIDTH, sett.WORLD_HEIGHT  #Half the charted area
+		self.center_x, self.center_y = None, None  #World position at the middle of the raster
+		self.raster = pygame.Surface((int(2 * self.width / sett.MINIMAP_SCALE), int(2 * self.height / sett.MINIMAP_SCALE)))
+		self.raster.fill(sett.colors["BLUE"])
+		self.chart = None  #The raster scaled for the screen, None when out of date
+		self.islands = None
+		self.rocks = None
+		self.painted = {}  #Obstacle: raster rect it covers
+
+	def to_raster(self, x, y):
+		return (x - self.center_x + self.width) / sett.MINIMAP_SCALE, (y - self.center_y + self.height) / sett.MINIMAP_SCALE
+
+	def paint(self, obstacle):
+		x, y = self.to_raster(obstacle.x, obstacle.y)
+		radius = obstacle.size / sett.MINIMAP_SCALE
+		if obstacle.kind == "island" and radius >= 3:
+			sprite = obstacle.get_coastline().get_sprite(round(radius), (sett.colors["SAND"], tuple(obstacle.color)))
+			return self.raster.blit(sprite, sprite.get_rect(center = (x, y)))
+		#Islands a little bigger than they are, to stand out from the rocks
+		return pygame.draw.circle(self.raster, obstacle.color, (x, y), max(2 if obstacle.kind == "island" else 1, radius))
+
+	def update(self, islands, rocks, boat_x, boat_y):
+		#Catches the raster up with the world's obstacle lists, which are rebuilt whenever chunks load or unload
+		center_x = (math.floor(boat_x / sett.CHUNK_SIZE) + 0.5) * sett.CHUNK_SIZE
+		center_y = (math.floor(boat_y / sett.CHUNK_SIZE) + 0.5) * sett.CHUNK_SIZE
+		if self.center_x is None or max(abs(center_x - self.center_x) / self.width, abs(center_y - self.center_y) / self.height) > sett.MINIMAP_RECENTER:
+			self.center_x, self.center_y = center_x, center_y
+			self.raster.fill(sett.colors["BLUE"])
+			self.painted = {}
+			self.islands = None
+		if islands is self.islands and rocks is self.rocks:
+			return
+		self.islands, self.rocks = islands, rocks
+		current = set(rocks) | set(islands)
+		erased = [self.painted.pop(obstacle) for obstacle in set(self.painted) - current]
+		for rect in erased:
+			self.raster.fill(sett.colors["BLUE"], rect)
+		#New obstacles, and any left that shared a patch just rubbed out. Rocks first so islands cover them.
+		repaint = [obstacle for obstacle in current if obstacle not in self.painted or self.painted[obstacle].collidelist(erased) != -1]
+		for obstacle in sorted(repaint, key = lambda obstacle: obstacle.kind == "island"):
+			self.painted[obstacle] = self.paint(obstacle)
+		self.chart = None
+
+	def draw(self, surface, pos, boat_x, boat_y, orientation):
+		if self.chart is None:
+			raster_width, raster_height = self.raster.get_size()
+			self.chart = pygame.transform.smoothscale(self.raster, (sett.MINIMAP_SIZE, round(sett.MINIMAP_SIZE * raster_height / raster_width)))
+		rect = surface.blit(self.chart, pos)
+		pygame.draw.rect(surface, sett.colors["WHITE"], rect, 1)
+
+		#The boat and its heading
+		scale = self.chart.get_width() / self.raster.get_width()
+		x, y = self.to_raster(boat_x, boat_y)
+		x, y = rect.left + x * scale, rect.top + y * scale
+		rad = math.radians(orientation)
+		pygame.draw.line(surface, sett.colors["RED"], (x, y), (x + math.sin(rad) * 8, y - math.cos(rad) * 8), 2)
+		pygame.draw.circle(surface, sett.colors["RED"], (x, y), 3)
+		#The heading can poke out past the frame
+		return rect.inflate(20, 20)
@@ -0,0 +1,77 @@
+import io
+import os
+import pygame
+import random
+
+import settings as sett
+
+from utils import BackgroundTask
+
+
+def read_track(index, path, task = None):
+	with open(path, "rb") as file:
+		return index, file.read()
+
+
+class MusicPlayer:
+	#Plays the playlist shuffled, round and round. While a track plays the next one is read into memory on a worker,
+	#so changing track never waits on the disk. Tracks missing at startup are left out, ones that fail to read or
+	#decode are dropped when they come up. Only one track streams at a time, so each fades in over the end of silence
+	#the last one left rather than overlapping it.
+	def __init__(self, playlist, end_event, ready_event):
+		self.end_event = end_event
+		self.ready_event = ready_event
+		self.playlist = [path for path in playlist if os.path.isfile(path)]
+		random.shuffle(self.playlist)
+		self.current = -1
+		self.prefetched = None  #(index, bytes) of the next track
+		self.prefetch_task = None
+		self.waiting = False  #Nothing playing until the prefetch lands
+
+	def start(self):
+		pygame.mixer.music.set_endevent(self.end_event)
+		self.waiting = True
+		self.prefetch()
+
+	def handle_event(self, event):
+		if event.type == self.end_event:
+			if self.prefetched:
+				self.play_next()
+			else:
+				self.waiting = True
+		elif event.type == self.ready_event and event.task is self.prefetch_task:
+			self.prefetch_task = None
+			if event.error:
+				self.drop((self.current + 1) % len(self.playlist))
+				return
+			self.prefetched = event.result
+			if self.waiting:
+				self.play_next()
+
+	def drop(self, index):
+		#Takes a bad track out and reads the one after it instead
+		del self.playlist[index]
+		if index <= self.current:
+			self.current -= 1
+		self.prefetch()
+
+	def play_next(self):
+		index, data = self.prefetched
+		self.prefetched = None
+		try:
+			pygame.mixer.music.load(io.BytesIO(data), os.path.splitext(self.playlist[index])[1][1:])
+			pygame.mixer.music.play(fade_ms = sett.MUSIC_FADE)
+		except pygame.error:
+			self.waiting = True
+			self.drop(index)
+			return
+		self.waiting = False
+		self.current = index
+		self.prefetch()
+
+	def prefetch(self):
+		if not self.playlist:
+			return
+		index = (self.current + 1) % len(self.playlist)
+		self.prefetch_task = BackgroundTask(self.ready_event, read_track, index, self.playlist[index])
+		self.prefetch_task.start()
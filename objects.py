@@ -5,7 +5,11 @@ import random
 
 import settings as sett
 
-from base_classes import MovingObject, StationaryObject
+from base_classes import MovingObject, StationaryObject, store_field
+from coastline import Coastline
+from particles import ParticleSystem
+from polar import get_polar
+from sprites import sprite_cache
 from syllables import Syllables
 
 
@@ -29,8 +33,10 @@ class Boat(MovingObject):
 		self.angular_velocity = 0
 		
 		self.island = None
-		self.wakes = []
+		self.polar = get_polar(sett.BOAT_POLAR)
+		self.wakes = ParticleSystem(sett.WAKE_CAPACITY, (180, 220, 255), (100, 200, 255))  #Bright light blue to softer blue fade-out
 		self.wake_timer = 0
+		self.store_previous()
 
 	#Controls
 	def adjust_reef(self, factor):
@@ -43,106 +49,90 @@ class Boat(MovingObject):
 		self.rudder = max(-30, min(30, self.rudder + delta))
 
 	#Physics / Wind
-	def apply_wind(self, wind, dt):
+	def apply_wind(self, direction, speed, dt):
+		#The wind where the boat is
 		if self.stopped:
 			return
 
-		#Compute relative wind angle
-		relative_wind = (wind.current_direction - self.orientation + 360) % 360
-
-		#Ideal sail angle (0-360)
-		ideal_sail_raw = relative_wind
-		#Normalize to 0-90°
-		ideal_sail = ideal_sail_raw % 180
-		if ideal_sail > 90:
-			ideal_sail = 180 - ideal_sail
-
-		#Compute effectiveness
-		effective_angle = abs(ideal_sail - self.sail)
-		if effective_angle > 90:
-			effective_angle = 180 - effective_angle
-
-		if 45 < relative_wind < 135 or 225 < relative_wind < 315:
-			sail_effectiveness = max(0, math.cos(math.radians(effective_angle)))
-		else:
-			sail_effectiveness = max(0, math.cos(math.radians(effective_angle)) * 0.2)
+		#Sail drive from the boat's polar table
+		polar = self.polar
+		relative_wind = (direction - self.orientation) % 360
+		sail_effectiveness = polar.drive(relative_wind, self.sail, self.reef)
 
 		#Target speed
-		raw_speed = (wind.current_speed * 0.2) * sail_effectiveness * self.reef
-		max_speed = 10 * self.reef + 2
-		speed_multiplier = 2
-		target_speed = min(raw_speed, max_speed) * speed_multiplier
+		raw_speed = (speed * sett.SAIL_WIND_PUSH) * sail_effectiveness
+		target_speed = min(raw_speed, polar.max_speed(self.reef)) * polar.speed_multiplier
 
 		#Smoothly adjust
-		accel_up = 0.5
-		accel_down = 0.2
-
 		if self.speed < target_speed:
-			self.speed += accel_up * dt
+			self.speed += sett.SAIL_ACCELERATION * dt
 			if self.speed > target_speed:
 				self.speed = target_speed
 		elif self.speed > target_speed:
-			self.speed -= accel_down * dt
+			self.speed -= sett.SAIL_DECELERATION * dt
 			if self.speed < target_speed:
 				self.speed = target_speed
 
 		#Drag
-		self.speed *= (1 - 0.005 * dt)
+		self.speed *= (1 - sett.SAIL_DRAG * dt)
 		self.speed = max(0, self.speed)
 
 		#Rudder
-		turn_rate = 2 / (1 + self.speed)
+		turn_rate = sett.SAIL_TURN_RATE / (1 + self.speed)
 		desired_angular_velocity = self.rudder * turn_rate
-		self.angular_velocity += (desired_angular_velocity - self.angular_velocity) * 0.05
+		self.angular_velocity += (desired_angular_velocity - self.angular_velocity) * min(1, sett.SAIL_HELM_RESPONSE * dt)
 		self.orientation += self.angular_velocity * dt
 		self.orientation %= 360
 
 		#Wind drift
-		angle_diff = (wind.current_direction - self.orientation + 360) % 360
+		angle_diff = (direction - self.orientation + 360) % 360
 		if angle_diff > 180:
 			angle_diff -= 360
-		self.orientation += (angle_diff * 0.001) * dt
+		self.orientation += (angle_diff * sett.SAIL_WEATHERVANE) * dt
 
 		#Drawing
-	def draw(self, screen, cam_x, cam_y):
+	def draw(self, screen, cam_x, cam_y, alpha = 1):
 		#Draw wakes first
-		for wake in self.wakes:
-			wake.draw(screen, cam_x, cam_y)
-
-		#Draw the boat on top
-		offset_x, offset_y = super(MovingObject, self).draw(cam_x, cam_y)
-		if not self.surface:
-			self.get_surface()
-			self.draw_self()
-		rotated_surface = pygame.transform.rotate(self.surface, -self.orientation)
-		rotated_rect = rotated_surface.get_rect(center=(int(offset_x), int(offset_y)))
-		screen.blit(rotated_surface, rotated_rect.topleft)
+		wake_rect = self.wakes.draw(screen, cam_x, cam_y)
+
+		#Draw the boat on top, between the last two physics steps
+		x, y, orientation = self.interpolate(alpha)
+		frames = self.get_atlas()
+		rotated_surface = frames[round(orientation / sett.BOAT_ATLAS_STEP) % len(frames)]
+		rotated_rect = rotated_surface.get_rect(center=(int(x - cam_x), int(y - cam_y)))
+		rect = screen.blit(rotated_surface, rotated_rect.topleft)
+		return rect.union(wake_rect) if wake_rect else rect
 
 	def draw_self(self):
-		self.surface = pygame.Surface((self.size*4, self.size*4), pygame.SRCALPHA)
+		self.surface = pygame.Surface((self.size*2, self.size*2), pygame.SRCALPHA)
 		self.surface.fill((0,0,0,0))
-		center = self.size*2  #Center of the surface
+		center = self.size  #Center of the surface
 		#Define triangle relative to center
 		front = (center, center - self.size)
 		left = (center - self.size/2, center + self.size/2)
 		right = (center + self.size/2, center + self.size/2)
 		pygame.draw.polygon(self.surface, self.color, [front, left, right])
 
+	def get_atlas(self):
+		#Every heading rotated once up front, a new size, color or step gets its own atlas
+		return sprite_cache.get(("boat", self.size, tuple(self.color), sett.BOAT_ATLAS_STEP), self.render_atlas)
+
+	def render_atlas(self):
+		self.draw_self()
+		step = sett.BOAT_ATLAS_STEP
+		return [pygame.transform.rotate(self.surface, -i * step) for i in range(round(360 / step))]
+
 	#Movement
 	def move(self, dt):
 		#Update wakes
-		for wake in self.wakes:
-			wake.update(dt)
+		self.wakes.update(dt)
 		if self.stopped:
 			return
 
 		#Move the boat
 		rad = math.radians(self.orientation)
-		speed_multiplier = 10
-		self.x += math.sin(rad) * self.speed * dt * speed_multiplier #X is sin
-		self.y -= math.cos(rad) * self.speed * dt * speed_multiplier #Y is -cos because Pygame Y-axis
-
-		self.wrap()
+		self.x += math.sin(rad) * self.speed * dt * sett.SAIL_DISTANCE_SCALE #X is sin
+		self.y -= math.cos(rad) * self.speed * dt * sett.SAIL_DISTANCE_SCALE #Y is -cos because Pygame Y-axis
 
 		#Spawn wakes behind boat
 		self.wake_timer += dt
@@ -150,11 +140,8 @@ class Boat(MovingObject):
 			spawn_distance = self.size * 0.5
 			wake_x = self.x - math.sin(rad) * spawn_distance
 			wake_y = self.y + math.cos(rad) * spawn_distance
-			self.wakes.append(Wake(self.speed, wake_x, wake_y))
+			self.wakes.emit(wake_x, wake_y, max(10, self.speed * 0.75))
 			self.wake_timer = 0
-
-		#Remove expired wakes
-		self.wakes = [w for w in self.wakes if w.lifetime > 0]
 		
 	def release(self):
 		self.island = None
@@ -172,181 +159,155 @@ class Boat(MovingObject):
 		self.stopped = True
 		
 		
-class Cloud(MovingObject):
-	def __init__(self, x=None, y=None):
-		super().__init__(x, y)
+class Cloud:
+	#Thin view over a row of a CloudField
+	x = store_field("x")
+	y = store_field("y")
+	draw_x = store_field("draw_x")
+	draw_y = store_field("draw_y")
+	shape = store_field("shape")
+
+	def __init__(self, store, index):
+		self.store = store
+		self.index = index
 		self.color = sett.colors["WHITE"]
 		self.size = 50
-		self.speed = 0
-		self.orientation = random.randint(0, 360)
-		self.x = x if x is not None else random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH)
-		self.y = y if y is not None else random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
-		
-		#Pre-render cloud surface
-		self.surface = pygame.Surface((self.size*2, self.size*2), pygame.SRCALPHA)
-		self._generate_circles()
 
-	def _generate_circles(self):
+	def draw(self, screen, cam_x, cam_y):
+		offset_x = int(self.draw_x - cam_x - self.size)
+		offset_y = int(self.draw_y - cam_y - self.size)
+		return screen.blit(self.get_sprite(), (offset_x, offset_y))
+
+	def get_sprite(self):
+		#CLOUD_SHAPES puffs shared by every cloud, each rendered the first time a cloud of that shape is drawn
+		return sprite_cache.get(("cloud", self.size, int(self.shape)), self.render_sprite)
+
+	def render_sprite(self):
+		rng = random.Random(int(self.shape))
+		surface = pygame.Surface((self.size*2, self.size*2), pygame.SRCALPHA)
 		max_radius = self.size // 2
 		for _ in range(25):
-			radius = random.randint(max_radius // 2, max_radius)
-			alpha = random.randint(200, 250)
-			offset_x = random.randint(-max_radius, max_radius)
-			offset_y = random.randint(-max_radius, max_radius)
+			radius = rng.randint(max_radius // 2, max_radius)
+			alpha = rng.randint(200, 250)
+			offset_x = rng.randint(-max_radius, max_radius)
+			offset_y = rng.randint(-max_radius, max_radius)
 			circle_color = (*self.color[:3], alpha)
-			pygame.draw.circle(self.surface, circle_color, (self.size + offset_x, self.size + offset_y), radius)
-
-	def apply_wind(self, wind):
-		#Convert compass direction (0° = north/up) to Pygame radians (0 = right)
-		rad = math.radians((wind.current_direction - 90) % 360)
-		speed_factor = 0.05
-		self.x += math.cos(rad) * wind.current_speed * speed_factor
-		self.y += math.sin(rad) * wind.current_speed * speed_factor
-
-		#Tiny random sway
-		self.x += random.uniform(-0.2, 0.2)
-		self.y += random.uniform(-0.2, 0.2)
-		
-		self.wrap()
-
-	def draw(self, screen, cam_x, cam_y):
-		offset_x = int(self.x - cam_x - self.size)
-		offset_y = int(self.y - cam_y - self.size)
-		screen.blit(self.surface, (offset_x, offset_y))
+			pygame.draw.circle(surface, circle_color, (self.size + offset_x, self.size + offset_y), radius)
+		return surface
 		
 		
 class Island(StationaryObject):
+	kind = "island"
+
 	def __init__(self, name=None, x=None, y=None, size=None):
 		super().__init__(x, y)
 		self.color = sett.colors["GREEN"]
 		self.name = name or random.choice(Syllables) + random.choice(Syllables)
 		self.size = size or random.randint(200, 600)
 		
+		self.coastline = None
 		self.island_name_surface = None
 
 	def check_docking(self, boat):
-		dist_sq = (boat.x - self.x) ** 2 + (boat.y - self.y) ** 2
-		return dist_sq <= self.size ** 2 and boat.speed < 2 and not boat.island
-		
-	def draw(self, screen, cam_x, cam_y):
-		offset_x = self.x - cam_x
-		offset_y = self.y - cam_y
-		if (offset_x + self.size < 0 or offset_x - self.size > sett.WIDTH or offset_y + self.size < 0 or offset_y - self.size > sett.HEIGHT):
-			return  #Off-screen
-		pygame.draw.circle(screen, self.color, (int(self.x - cam_x), int(self.y - cam_y)), self.size)
+		#Whether a boat that has reached the shore (see World.collide) ties up rather than bouncing off
+		return boat.speed < 2 and not boat.island
+
+	def contact(self, x0, y0, x1, y1, t, padding = 0):
+		return self.get_coastline().contact(x0 - self.x, y0 - self.y, x1 - self.x, y1 - self.y, t, padding)
+
+	def get_coastline(self):
+		#Built on first use from the name and position, so saves don't need to store it
+		if self.coastline is None:
+			self.coastline = Coastline(f"{self.name}:{self.x}:{self.y}", self.size)
+		return self.coastline
+
+	def radius_toward(self, x, y):
+		#Distance to the shore in the direction of (x, y)
+		return float(self.get_coastline().radius_at(math.atan2(y - self.y, x - self.x)))
+
+	def get_sprite(self):
+		return self.get_coastline().get_sprite(self.size, (sett.colors["SAND"], tuple(self.color)))
 		
 		
 class Rock(StationaryObject):
-	def __init__(self, x = None, y = None):
+	kind = "rock"
+
+	def __init__(self, x = None, y = None, size = None):
 		super().__init__(x, y)
 		self.color = sett.colors["GREY"]
-		self.size = random.randint(10, 150)
-		self.x, self.y = random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH), random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
-		self.create_surface()
-		
-	def create_surface(self):
-		self.surface = pygame.Surface((self.size*2, self.size*2), pygame.SRCALPHA)
-		pygame.draw.circle(self.surface, self.color, (self.size, self.size), self.size)
-		
-	def draw(self, screen, cam_x, cam_y):
-		offset_x = self.x - cam_x
-		offset_y = self.y - cam_y
-		if (offset_x + self.size < 0 or offset_x - self.size > sett.WIDTH or offset_y + self.size < 0 or offset_y - self.size > sett.HEIGHT):
-			return  #Off-screen
-		pygame.draw.circle(screen, self.color, (int(self.x - cam_x), int(self.y - cam_y)), self.size)
+		self.size = size or random.randint(10, 150)
+		self.x = x if x is not None else random.uniform(-sett.WORLD_WIDTH, sett.WORLD_WIDTH)
+		self.y = y if y is not None else random.uniform(-sett.WORLD_HEIGHT, sett.WORLD_HEIGHT)
 		
 		
-class Seagull(MovingObject):
-	def __init__(self, home_x, home_y, max_radius=500):
-		self.speed = random.uniform(1.5, 3.0)
-		self.flap_phase = random.uniform(0, 2 * math.pi)
-		self.interval = random.randint(1500, 2500)
-		self.last_change = 0
-		self.n = 0
-		self.orientation = random.randint(0, 360)
+class Seagull:
+	#Thin view over a row of a Flock, which does the flying
+	x = store_field("x")
+	y = store_field("y")
+	draw_x = store_field("draw_x")
+	draw_y = store_field("draw_y")
+	orientation = store_field("orientation")
+	speed = store_field("speed")
+	flap_phase = store_field("flap_phase")
+
+	def __init__(self, store, index):
+		self.store = store
+		self.index = index
 		self.size = 20
-		self.surface = None
-
-		# anchor point island/rock
-		self.home_x, self.home_y = home_x, home_y
-		self.max_radius = max_radius
-
-		#Start near home
-		self.x = home_x + random.randint(-max_radius//2, max_radius//2)
-		self.y = home_y + random.randint(-max_radius//2, max_radius//2)
 		
 	def draw(self, screen, cam_x, cam_y):
-		offset_x = self.x - cam_x
-		offset_y = self.y - cam_y
-		if (offset_x + self.size >= -sett.WIDTH * 2 and offset_x <= sett.WIDTH * 3) and (offset_y + self.size >= -sett.HEIGHT * 2 and offset_y <= sett.HEIGHT * 3):
-			self.draw_surface()
-			screen.blit(self.surface, (int(offset_x - self.size), int(offset_y - self.size)))
-		
-	def draw_self(self):
-		flap_angle = 15 * math.sin(self.flap_phase)
-		left_x = self.size - self.size * math.cos(math.radians(30 + flap_angle))
-		left_y = self.size - self.size * math.sin(math.radians(30 + flap_angle))
-		pygame.draw.line(self.surface, sett.colors["WHITE"], (self.size, self.size), (left_x, left_y), 2)
-		right_x = self.size + self.size * math.cos(math.radians(30 + flap_angle))
-		right_y = self.size - self.size * math.sin(math.radians(30 + flap_angle))
-		pygame.draw.line(self.surface, sett.colors["WHITE"], (self.size, self.size), (right_x, right_y), 2)
-		
-	def draw_surface(self):
-		if not self.surface:
-			self.get_surface()
-		self.surface.fill((0, 0, 0, 0))
-		self.draw_self()
-		
-	def move(self, time):
-		self.flap_phase += self.speed * 0.05
-		self.flap_phase %= 2 * math.pi
-		if self.n >= 1:
-			self.n = 0
-			super().move()
-
-			#Check distance from home
-			dx = self.x - self.home_x
-			dy = self.y - self.home_y
-			dist_sq = dx*dx + dy*dy
-
-			if dist_sq > self.max_radius**2:
-				#Force orientation back toward home
-				self.orientation = math.degrees(math.atan2(-dy, -dx))
-			elif time - self.last_change > self.interval:
-				self.last_change = time
-				self.orientation = random.randint(0, 360)
-		else:
-			self.n += 1
+		frames = self.get_frames()
+		frame = int(self.flap_phase / (2 * math.pi) * len(frames)) % len(frames)
+		return screen.blit(frames[frame], (int(self.draw_x - cam_x - self.size), int(self.draw_y - cam_y - self.size)))
+
+	def get_frames(self):
+		#One set of wing poses shared by every gull, picked by flap phase
+		return sprite_cache.get(("seagull", self.size, sett.colors["WHITE"], sett.SEAGULL_FLAP_FRAMES), self.render_frames)
 		
+	def render_frames(self):
+		frames = []
+		for i in range(sett.SEAGULL_FLAP_FRAMES):
+			surface = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
+			flap_angle = 15 * math.sin(2 * math.pi * i / sett.SEAGULL_FLAP_FRAMES)
+			left_x = self.size - self.size * math.cos(math.radians(30 + flap_angle))
+			left_y = self.size - self.size * math.sin(math.radians(30 + flap_angle))
+			pygame.draw.line(surface, sett.colors["WHITE"], (self.size, self.size), (left_x, left_y), 2)
+			right_x = self.size + self.size * math.cos(math.radians(30 + flap_angle))
+			right_y = self.size - self.size * math.sin(math.radians(30 + flap_angle))
+			pygame.draw.line(surface, sett.colors["WHITE"], (self.size, self.size), (right_x, right_y), 2)
+			frames.append(surface)
+		return frames
 		
-class Wake:
-	def __init__(self, speed, x, y):
-		self.x = x
-		self.y = y
-		self.size = 10
-		self.lifetime = max(10, speed * 0.75)
-		self.max_lifetime = self.lifetime
-		self.color_start = (180, 220, 255)   #Bright light blue
-		self.color_end = (100, 200, 255)     #Softer blue fade-out
-
-
-	def update(self, dt):
-		self.lifetime -= dt * 5
-		if self.lifetime < 0:
-			self.lifetime = 0
-		self.size += 5 * dt
 		
+class Vessel:
+	#Thin view over a row of a Fleet, drawn with the same pre-rotated frames as the player's boat
+	x = store_field("x")
+	y = store_field("y")
+	draw_x = store_field("draw_x")
+	draw_y = store_field("draw_y")
+	orientation = store_field("orientation")
+	paint = store_field("paint")
+
+	def __init__(self, store, index):
+		self.store = store
+		self.index = index
+		self.size = 14
+		self.surface = None
+
+	@property
+	def color(self):
+		return sett.FLEET_COLORS[self.paint % len(sett.FLEET_COLORS)]
 
 	def draw(self, screen, cam_x, cam_y):
-		if self.lifetime <= 0:
-			return
-		offset_x = int(self.x - cam_x)
-		offset_y = int(self.y - cam_y)
-		t = 1 - (self.lifetime / self.max_lifetime)
-		color = (int(self.color_start[0] * (1 - t) + self.color_end[0] * t), int(self.color_start[1] * (1 - t) + self.color_end[1] * t), int(self.color_start[2] * (1 - t) + self.color_end[2] * t),)
-		pygame.draw.circle(screen, color, (int(offset_x), int(offset_y)), int(self.size))
-		
-		
+		frames = self.get_atlas()
+		frame = frames[round(self.orientation / sett.BOAT_ATLAS_STEP) % len(frames)]
+		return screen.blit(frame, frame.get_rect(center = (int(self.draw_x - cam_x), int(self.draw_y - cam_y))))
+
+	draw_self = Boat.draw_self
+	get_atlas = Boat.get_atlas
+	render_atlas = Boat.render_atlas
+
+
 class Wind:
 	def __init__(self):
 		self.base_direction = random.randint(0, 360)
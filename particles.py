@@ -0,0 +1,63 @@
+import copy
+import numpy as np
+import pygame
+
+
+class ParticleSystem:
+	#Fixed-size ring buffer, emitting past capacity recycles the oldest slot
+	def __init__(self, capacity, color_start, color_end, size = 10, growth = 5, decay = 5, shades = 32):
+		self.capacity = capacity
+		self.decay = decay
+		self.growth = growth
+		self.head = 0
+		self.start_size = size
+		self.x = np.zeros(capacity)
+		self.y = np.zeros(capacity)
+		self.size = np.zeros(capacity)
+		self.lifetime = np.zeros(capacity)
+		self.max_lifetime = np.ones(capacity)
+
+		#Colour over a particle's life, looked up rather than lerped per draw
+		steps = np.linspace(0, 1, shades)[:, None]
+		gradient = np.array(color_start) * (1 - steps) + np.array(color_end) * steps
+		self.gradient = [tuple(shade) for shade in gradient.astype(int).tolist()]
+
+	def __len__(self):
+		return int(np.count_nonzero(self.lifetime > 0))
+
+	def copy(self):
+		particles = copy.copy(self)
+		for name in ("x", "y", "size", "lifetime", "max_lifetime"):
+			setattr(particles, name, getattr(self, name).copy())
+		return particles
+
+	def clear(self):
+		self.lifetime[:] = 0
+
+	def emit(self, x, y, lifetime):
+		i = self.head
+		self.x[i], self.y[i] = x, y
+		self.size[i] = self.start_size
+		self.lifetime[i] = self.max_lifetime[i] = lifetime
+		self.head = (i + 1) % self.capacity
+
+	def update(self, dt):
+		#Whole-buffer, in place; dead slots just stay at zero lifetime
+		self.size += (self.lifetime > 0) * (self.growth * dt)
+		np.subtract(self.lifetime, dt * self.decay, out = self.lifetime)
+		np.maximum(self.lifetime, 0, out = self.lifetime)
+
+	def draw(self, screen, cam_x, cam_y):
+		#Oldest first so newer particles land on top
+		order = (self.head + np.arange(self.capacity)) % self.capacity
+		order = order[self.lifetime[order] > 0]
+		if not len(order):
+			return None
+		ages = 1 - self.lifetime[order] / self.max_lifetime[order]
+		shades = (ages * (len(self.gradient) - 1)).astype(int).tolist()
+		xs = (self.x[order] - cam_x).astype(int).tolist()
+		ys = (self.y[order] - cam_y).astype(int).tolist()
+		sizes = self.size[order].astype(int).tolist()
+		gradient = self.gradient
+		rects = [pygame.draw.circle(screen, gradient[shade], (x, y), size) for x, y, size, shade in zip(xs, ys, sizes, shades)]
+		return rects[0].unionall(rects[1:])
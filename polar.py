@@ -0,0 +1,144 @@
+import array
+import json
+import math
+import numpy as np
+import sys
+
+
+class Polar:
+	#How hard the sails drive the boat for every (relative wind, sail angle, reef), looked up instead of worked out per tick.
+	#Axes are evenly spaced: relative wind in degrees wrapping round from 0, sail in degrees, reef 0-1.
+	#drive is the fraction of the wind's push reaching the hull, the hull then caps it at base_speed + reef_speed * reef.
+	def __init__(self, name, relative_wind, sail, reef, drive, base_speed = 2, reef_speed = 10, speed_multiplier = 2):
+		self.name = name
+		self.base_speed = base_speed
+		self.reef_speed = reef_speed
+		self.speed_multiplier = speed_multiplier
+		self.drive_table = np.asarray(drive, float)
+		self.axes = [np.asarray(axis, float) for axis in (relative_wind, sail, reef)]
+		if self.drive_table.shape != tuple(len(axis) for axis in self.axes):
+			raise ValueError(f"Polar {name}: drive table is {self.drive_table.shape}, axes are {tuple(len(axis) for axis in self.axes)}")
+		for axis in self.axes:
+			if len(axis) < 2 or not np.allclose(np.diff(axis), axis[1] - axis[0]) or axis[1] <= axis[0]:
+				raise ValueError(f"Polar {name}: axes must be evenly spaced and increasing")
+		if self.axes[0][0] != 0 or not math.isclose(self.axes[0][-1] + self.axes[0][1], 360):
+			raise ValueError(f"Polar {name}: relative wind must run from 0 up to one step short of 360")
+		self.best_sails = None
+		#Flat copy and plain floats for drive(), reading single entries from them beats indexing the array
+		self.flat_table = array.array("d", self.drive_table.ravel())
+		self.table_shape = self.drive_table.shape
+		self.sail_axis = (float(self.axes[1][0]), float(self.axes[1][1] - self.axes[1][0]), len(self.axes[1]))
+		self.reef_axis = (float(self.axes[2][0]), float(self.axes[2][1] - self.axes[2][0]), len(self.axes[2]))
+		self.wind_step = float(self.axes[0][1])
+
+	def drive(self, relative_wind, sail, reef):
+		#One boat's drive, trilinear between the eight table entries around it
+		#Clamped to the sail and reef axes, held at the last interval's far end past them
+		start, step, count = self.sail_axis
+		position = (sail - start) / step
+		j = 0 if position < 0 else count - 2 if position >= count - 2 else int(position)
+		fs = 0 if position < 0 else 1 if position > count - 1 else position - j
+		start, step, count = self.reef_axis
+		position = (reef - start) / step
+		k = 0 if position < 0 else count - 2 if position >= count - 2 else int(position)
+		fr = 0 if position < 0 else 1 if position > count - 1 else position - k
+		winds, sails, reefs = self.table_shape
+		position = relative_wind % 360 / self.wind_step
+		i = int(position)
+		fw = position - i
+		t = self.flat_table
+		a0 = (i % winds * sails + j) * reefs + k
+		b0 = ((i + 1) % winds * sails + j) * reefs + k
+		a1, b1 = a0 + reefs, b0 + reefs
+		a0 = t[a0] + (t[a0 + 1] - t[a0]) * fr
+		a1 = t[a1] + (t[a1 + 1] - t[a1]) * fr
+		b0 = t[b0] + (t[b0 + 1] - t[b0]) * fr
+		b1 = t[b1] + (t[b1 + 1] - t[b1]) * fr
+		a = a0 + (a1 - a0) * fs
+		return a + (b0 + (b1 - b0) * fs - a) * fw
+
+	def best_sail(self, relative_wind):
+		#Sail angle giving the most drive with full sail, per relative wind (arrays), nearest table row
+		if self.best_sails is None:
+			self.best_sails = self.axes[1][self.drive_table[:, :, -1].argmax(axis = 1)]
+		rows = np.rint(np.mod(relative_wind, 360) / self.wind_step).astype(np.intp) % len(self.best_sails)
+		return self.best_sails[rows]
+
+	def drive_many(self, relative_wind, sail, reef):
+		#drive() for arrays of boats, trilinear over the whole table with all eight corners in one gather
+		table = self.drive_table
+		w = np.mod(relative_wind, 360) / self.wind_step
+		i0 = np.floor(w).astype(np.intp)
+		fw = w - i0
+		i0 %= table.shape[0]
+		i1 = (i0 + 1) % table.shape[0]
+		corners = []
+		for axis, value in zip(self.axes[1:], (sail, reef)):
+			position = np.minimum(np.maximum((value - axis[0]) / (axis[1] - axis[0]), 0), len(axis) - 1)
+			index = np.minimum(position.astype(np.intp), len(axis) - 2)
+			corners.append((index, position - index))
+		(j, fs), (k, fr) = corners
+		sails, reefs = table.shape[1:]
+		rows = [i * sails * reefs + j * reefs + k for i in (i0, i1)]
+		c = table.take(np.concatenate([row + offset for row in rows for offset in (0, 1, reefs, reefs + 1)])).reshape(8, -1)
+		c = c[::2] + (c[1::2] - c[::2]) * fr
+		c = c[::2] + (c[1::2] - c[::2]) * fs
+		return c[0] + (c[1] - c[0]) * fw
+
+	def max_speed(self, reef):
+		return self.base_speed + self.reef_speed * reef
+
+	def to_json(self):
+		return {
+			"name": self.name,
+			"base_speed": self.base_speed,
+			"reef_speed": self.reef_speed,
+			"speed_multiplier": self.speed_multiplier,
+			"relative_wind": self.axes[0].tolist(),
+			"sail": self.axes[1].tolist(),
+			"reef": self.axes[2].tolist(),
+			"drive": np.round(self.drive_table, 4).tolist(),
+		}
+
+
+def classic_drive(relative_wind, sail, reef):
+	#The original sail model: best with the sail square to the wind's angle off the bow, a fifth as good outside the reaches
+	ideal_sail = relative_wind % 180
+	ideal_sail = np.where(ideal_sail > 90, 180 - ideal_sail, ideal_sail)
+	effective_angle = np.abs(ideal_sail - sail)
+	effective_angle = np.where(effective_angle > 90, 180 - effective_angle, effective_angle)
+	reaching = ((45 < relative_wind) & (relative_wind < 135)) | ((225 < relative_wind) & (relative_wind < 315))
+	sail_effectiveness = np.maximum(0, np.cos(np.radians(effective_angle)) * np.where(reaching, 1, 0.2))
+	return sail_effectiveness * reef
+
+
+def build(name, model, wind_step = 1, sail_step = 1, reef_step = 0.1, **hull):
+	#Tabulates model(relative_wind, sail, reef) over the full range of each axis.
+	#The classic model is linear in reef, so reef_step = 1 loses nothing for it.
+	relative_wind = np.arange(0, 360, wind_step)
+	sail = np.linspace(0, 90, round(90 / sail_step) + 1)
+	reef = np.linspace(0, 1, round(1 / reef_step) + 1)
+	drive = model(*np.meshgrid(relative_wind, sail, reef, indexing = "ij"))
+	return Polar(name, relative_wind, sail, reef, drive, **hull)
+
+
+def load(path):
+	with open(path) as file:
+		data = json.load(file)
+	return Polar(**data)
+
+
+polars = {}
+
+
+def get_polar(path):
+	#Loaded once per path, None is the built-in sloop
+	if path not in polars:
+		polars[path] = load(path) if path else build("Sloop", classic_drive, reef_step = 1)
+	return polars[path]
+
+
+if __name__ == "__main__":
+	#python polar.py out.json writes the built-in polar as a starting point for a new profile
+	with open(sys.argv[1], "w") as file:
+		json.dump(build("Sloop", classic_drive, wind_step = 5, sail_step = 5, reef_step = 1).to_json(), file)
@@ -0,0 +1,128 @@
+import json
+import sys
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+
+class NullProfiler:
+	def span(self, name):
+		return nullcontext()
+
+	def count(self, name, value):
+		pass
+
+
+class Profiler:
+	#Span timings: running totals for report(), the last frames spans per frame (see end_frame) for the overlay,
+	#and the last trace_events spans with their start times for export_trace. Spans can come from any thread.
+	def __init__(self, track_allocations = False, frames = 0, trace_events = 0):
+		self.allocations = {}
+		self.counts = {}
+		self.totals = {}
+		self.track_allocations = track_allocations
+		self.frame_counts = {}  #count() totals so far this frame
+		self.frame_spans = {}  #ms per span so far this frame
+		self.frame_start = None
+		self.frames = deque(maxlen = frames or 1)  #(ms, spans, counts) per finished frame
+		self.origin = time.perf_counter()
+		self.trace = deque(maxlen = trace_events) if trace_events else None
+
+	@contextmanager
+	def span(self, name):
+		blocks = sys.getallocatedblocks() if self.track_allocations else 0
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			duration = time.perf_counter() - start
+			self.totals[name] = self.totals.get(name, 0) + duration
+			self.counts[name] = self.counts.get(name, 0) + 1
+			self.frame_spans[name] = self.frame_spans.get(name, 0) + duration * 1000
+			if self.trace is not None:
+				self.trace.append(("X", name, start, duration, threading.get_ident()))
+			if self.track_allocations:
+				self.allocations[name] = self.allocations.get(name, 0) + sys.getallocatedblocks() - blocks
+
+	def count(self, name, value):
+		#How many of something this frame: entities updated, drawn...
+		self.frame_counts[name] = self.frame_counts.get(name, 0) + value
+
+	def end_frame(self):
+		#Closes the frame begun by the last call
+		now = time.perf_counter()
+		spans, counts = self.frame_spans, self.frame_counts
+		self.frame_spans, self.frame_counts = {}, {}
+		if self.frame_start is not None:
+			self.frames.append(((now - self.frame_start) * 1000, spans, counts))
+			if self.trace is not None:
+				thread = threading.get_ident()
+				self.trace.append(("X", "frame", self.frame_start, now - self.frame_start, thread))
+				if counts:
+					self.trace.append(("C", "counts", now, counts, thread))
+		self.frame_start = now
+
+	def rolling(self):
+		#Over the kept frames: frame times (ms), {span: (mean ms, max ms)} and {count: mean} per frame
+		frames = list(self.frames)
+		spans, counts = {}, {}
+		for _, frame_spans, frame_counts in frames:
+			for name, ms in frame_spans.items():
+				total, peak = spans.get(name, (0, 0))
+				spans[name] = (total + ms, max(peak, ms))
+			for name, value in frame_counts.items():
+				counts[name] = counts.get(name, 0) + value
+		number = max(1, len(frames))
+		return ([ms for ms, _, _ in frames],
+			{name: (total / number, peak) for name, (total, peak) in spans.items()},
+			{name: value / number for name, value in counts.items()})
+
+	def trace_snapshot(self):
+		#What export_trace needs, cheap enough to take on the game loop
+		threads = {thread.ident: thread.name for thread in threading.enumerate()}
+		return list(self.trace or ()), threads, self.origin
+
+	def report(self):
+		spans = {}
+		for name, total in self.totals.items():
+			count = self.counts[name]
+			spans[name] = {
+				"calls": count,
+				"total_ms": round(total * 1000, 3),
+				"mean_us": round(total / count * 1e6, 3),
+			}
+			if self.track_allocations:
+				spans[name]["allocated_blocks"] = self.allocations[name]
+		return spans
+
+	def reset(self):
+		self.allocations = {}
+		self.counts = {}
+		self.totals = {}
+		self.frame_counts = {}
+		self.frame_spans = {}
+		self.frame_start = None
+		self.frames.clear()
+		if self.trace is not None:
+			self.trace.clear()
+
+
+def export_trace(snapshot, path, task = None):
+	#Writes a Profiler.trace_snapshot as Chrome trace JSON (chrome://tracing, Perfetto), returns the path
+	events, threads, origin = snapshot
+	trace = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": thread, "args": {"name": threads.get(thread, f"Thread {thread}")}}
+		for thread in {event[4] for event in events}]
+	for number, (phase, name, start, value, thread) in enumerate(events):
+		event = {"name": name, "ph": phase, "pid": 1, "tid": thread, "ts": round((start - origin) * 1e6, 1)}
+		if phase == "X":
+			event["dur"] = round(value * 1e6, 1)
+		else:
+			event["args"] = value
+		trace.append(event)
+		if task and number % 10000 == 0:
+			task.progress = number / len(events)
+	with open(path, "w") as file:
+		json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, file)
+	return path
@@ -0,0 +1,95 @@
+import pygame
+
+from profiler import NullProfiler
+
+
+class Renderer:
+	#Three layers: a background (sea and stationary world) that only changes when the camera moves,
+	#the dynamic sprites on top of it, and a cached UI layer over both. With the camera still only
+	#the rects touched last frame and this frame are restored, redrawn and pushed to the display.
+	def __init__(self, screen, profiler = None):
+		self.profiler = profiler or NullProfiler()
+		self.screen = screen
+		self.background = pygame.Surface(screen.get_size()).convert()
+		self.background_valid = False
+		self.cam = None
+		self.dirty = []
+		self.full = True
+		self.ui = pygame.Surface(screen.get_size(), pygame.SRCALPHA).convert_alpha()
+		self.ui_key = None
+		self.ui_rect = pygame.Rect(0, 0, 0, 0)
+
+	def blit_ui(self, rects):
+		for rect in rects:
+			clip = rect.clip(self.ui_rect)
+			if clip:
+				self.screen.blit(self.ui, clip, clip)
+
+	def draw_layers(self, draw_dynamic, draw_overlay, restore = None):
+		#Dynamic sprites, the UI over them (just where restore or the sprites touched, else all of it) and the overlay
+		screen = self.screen
+		span = self.profiler.span
+		with span("draw_dynamic"):
+			rects = [rect for rect in draw_dynamic(screen) if rect]
+		with span("draw_ui"):
+			self.blit_ui([self.ui_rect] if restore is None else restore + rects)
+		if draw_overlay:
+			with span("draw_overlay"):
+				rects.extend(rect for rect in draw_overlay(screen) if rect)
+		return rects
+
+	def invalidate(self):
+		#Next frame redraws and flips everything
+		self.background_valid = False
+		self.full = True
+
+	def render(self, cam, draw_background, draw_dynamic, draw_overlay = None):
+		#draw_background(surface) paints the static world, draw_dynamic and draw_overlay return the rects they drew
+		screen = self.screen
+		span = self.profiler.span
+		if cam != self.cam:
+			#Scrolling: everything moved, don't bother caching the background
+			self.cam = cam
+			self.background_valid = False
+			with span("draw_background"):
+				draw_background(screen)
+			self.dirty = self.draw_layers(draw_dynamic, draw_overlay)
+			self.flip()
+			return
+		if not self.background_valid:
+			with span("draw_background"):
+				draw_background(self.background)
+			self.background_valid = True
+			self.full = True
+		if self.full:
+			screen.blit(self.background, (0, 0))
+			self.dirty = self.draw_layers(draw_dynamic, draw_overlay)
+			self.flip()
+			return
+
+		#Camera still: erase last frame's sprites, draw this frame's, put the UI back over both
+		old = self.dirty
+		with span("draw_background"):
+			for rect in old:
+				screen.blit(self.background, rect, rect)
+		rects = self.draw_layers(draw_dynamic, draw_overlay, old)
+		self.dirty = rects
+		if old or rects:
+			with span("flip"):
+				pygame.display.update(old + rects)
+
+	def flip(self):
+		self.full = False
+		with self.profiler.span("flip"):
+			pygame.display.flip()
+
+	def set_ui(self, key, draw_ui):
+		#draw_ui(surface) paints the UI layer, only called again when the key changes
+		if key == self.ui_key:
+			return
+		self.ui_key = key
+		self.ui.fill((0, 0, 0, 0))
+		draw_ui(self.ui)
+		self.ui_rect = self.ui.get_bounding_rect()
+		self.ui.set_alpha(255, pygame.RLEACCEL)
+		self.invalidate()
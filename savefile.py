@@ -0,0 +1,175 @@
+import struct
+import sys
+
+from array import array
+
+
+MAGIC = b"PSAV"
+VERSION = 1
+
+#Table -> ((column, type code, default), ...). Type codes are array module codes, "s" is UTF-8 text.
+#New columns can be appended freely: older saves read them back as the default.
+SCHEMA = {
+	"world": (
+		("seed", "q", 0),
+		("spawn_x", "d", 0.0),
+		("spawn_y", "d", 0.0),
+		("chunk_size", "q", 0),
+		("time", "d", 0.0),
+	),
+	"boat": (
+		("x", "d", 0.0),
+		("y", "d", 0.0),
+		("orientation", "d", 90.0),
+		("last_orientation", "d", 90.0),
+		("speed", "d", 0.0),
+		("acceleration", "d", 0.0),
+		("angular_velocity", "d", 0.0),
+		("reef", "d", 0.0),
+		("rudder", "d", 0.0),
+		("sail", "d", 45.0),
+		("stopped", "B", 0),
+		("wake_timer", "d", 0.0),
+		("island_x", "d", float("nan")),
+		("island_y", "d", float("nan")),
+	),
+	"wind": (
+		("base_direction", "d", 0.0),
+		("base_speed", "d", 20.0),
+		("current_direction", "d", 0.0),
+		("current_speed", "d", 20.0),
+		("interval", "q", 5000),
+		("last_change", "q", 0),
+	),
+	"chunks": (
+		("cx", "q", 0),
+		("cy", "q", 0),
+	),
+	"islands": (
+		("chunk", "q", 0),
+		("x", "d", 0.0),
+		("y", "d", 0.0),
+		("size", "q", 200),
+		("name", "s", ""),
+	),
+	"rocks": (
+		("chunk", "q", 0),
+		("x", "d", 0.0),
+		("y", "d", 0.0),
+		("size", "q", 10),
+	),
+	"nests": (
+		("chunk", "q", 0),
+		("x", "d", 0.0),
+		("y", "d", 0.0),
+		("count", "q", 0),
+		("max_radius", "q", 500),
+	),
+}
+
+HEADER = struct.Struct("<4sHH")
+TABLE = struct.Struct("<II")
+COLUMN = struct.Struct("<cI")
+
+
+def pack(tables):
+	#{table: {column: sequence}} -> bytes, columns stored as packed little-endian arrays
+	chunks = [HEADER.pack(MAGIC, VERSION, len(tables))]
+	for table_name, columns in tables.items():
+		fields = SCHEMA[table_name]
+		rows = len(columns[fields[0][0]]) if fields else 0
+		chunks.append(pack_text(table_name))
+		chunks.append(TABLE.pack(rows, len(fields)))
+		for name, code, _ in fields:
+			values = columns[name]
+			if len(values) != rows:
+				raise ValueError(f"Column {table_name}.{name} has {len(values)} rows, expected {rows}")
+			if code == "s":
+				encoded = [value.encode("utf-8") for value in values]
+				data = to_bytes(array("I", [len(value) for value in encoded])) + b"".join(encoded)
+			else:
+				data = to_bytes(array(code, values))
+			chunks.append(pack_text(name))
+			chunks.append(COLUMN.pack(code.encode("ascii"), len(data)))
+			chunks.append(data)
+	return b"".join(chunks)
+
+
+def unpack(data):
+	#bytes -> {table: {column: list}}, filling columns missing from older saves with schema defaults
+	view = memoryview(data)
+	magic, version, table_count = HEADER.unpack_from(view, 0) if len(view) >= HEADER.size else (None, 0, 0)
+	if magic != MAGIC:
+		raise ValueError("Not a Polysail save file")
+	if version > VERSION:
+		raise ValueError(f"Save version {version} is newer than this game supports ({VERSION})")
+	try:
+		tables = unpack_tables(view, table_count)
+	except (IndexError, ValueError, struct.error) as e:
+		raise ValueError("Save file is cut short or damaged") from e
+	for table_name, fields in SCHEMA.items():
+		columns = tables.setdefault(table_name, {})
+		rows = len(next(iter(columns.values()))) if columns else 0
+		for name, _, default in fields:
+			columns.setdefault(name, [default] * rows)
+	return tables
+
+
+def pack_text(text):
+	encoded = text.encode("utf-8")
+	return struct.pack("<B", len(encoded)) + encoded
+
+
+def unpack_tables(view, table_count):
+	#{table: {column: list}} as stored, reading on from the header
+	pos = HEADER.size
+	tables = {}
+	for _ in range(table_count):
+		table_name, pos = unpack_text(view, pos)
+		rows, column_count = TABLE.unpack_from(view, pos)
+		pos += TABLE.size
+		columns = {}
+		for _ in range(column_count):
+			name, pos = unpack_text(view, pos)
+			code, size = COLUMN.unpack_from(view, pos)
+			pos += COLUMN.size
+			code = code.decode("ascii")
+			raw = view[pos:pos + size]
+			pos += size
+			if code == "s":
+				offset = rows * array("I").itemsize
+				lengths = from_bytes("I", raw[:offset])
+				values = []
+				for length in lengths:
+					values.append(bytes(raw[offset:offset + length]).decode("utf-8"))
+					offset += length
+				columns[name] = values
+			else:
+				columns[name] = from_bytes(code, raw).tolist()
+		tables[table_name] = columns
+	return tables
+
+
+def unpack_text(view, pos):
+	length = view[pos]
+	return bytes(view[pos + 1:pos + 1 + length]).decode("utf-8"), pos + 1 + length
+
+
+def to_bytes(values):
+	if sys.byteorder == "big":
+		values.byteswap()
+	return values.tobytes()
+
+
+def from_bytes(code, raw):
+	values = array(code)
+	values.frombytes(raw)
+	if sys.byteorder == "big":
+		values.byteswap()
+	return values
+
+
+def iter_rows(columns):
+	#{column: [values]} -> [{column: value}, ...]
+	names = list(columns)
+	return [dict(zip(names, values)) for values in zip(*columns.values())]
@@ -0,0 +1,129 @@
+import pygame
+
+import settings as sett
+
+from objects import Wind
+from stores import CloudField
+from utils import Button, render_multiline, text_cache
+
+
+#Events that count as the player doing something, anything else (music ending, saves) doesn't wake an idle menu
+INPUT_EVENTS = (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.MOUSEWHEEL, pygame.FINGERDOWN, pygame.FINGERMOTION)
+
+
+class Scene:
+	#A menu screen kept for the whole session: its content is built the first time it's shown, after that showing it
+	#only draws. Animated scenes run at MENU_FPS, MENU_IDLE_FPS once nobody has touched anything for MENU_IDLE_AFTER ms.
+	#Still ones sleep until there's an event.
+	animated = False
+
+	def __init__(self, game, state):
+		self.built = False
+		self.game = game
+		self.state = state
+
+	def build(self):
+		pass
+
+	def draw_background(self, surface):
+		self.game.draw_sea(surface)
+
+	def draw_dynamic(self, surface):
+		return []
+
+	def draw_ui(self, surface):
+		for button in self.game.buttons:
+			button.draw(surface)
+
+	def run(self):
+		#Shows the scene until the game moves to another state
+		game = self.game
+		if not self.built:
+			self.build()
+			self.built = True
+		game.game_running = True
+		game.renderer.set_ui((self.state, game.load_status), self.draw_ui)
+		game.clock.tick()
+		last_input = pygame.time.get_ticks()
+		while game.game_running and game.state == self.state:
+			self.update(game.clock.get_time() / 1000)
+			game.renderer.render((0, 0), self.draw_background, self.draw_dynamic)
+			game.mark_startup("menu")
+			if self.animated:
+				idle = pygame.time.get_ticks() - last_input > sett.MENU_IDLE_AFTER
+				game.clock.tick(sett.MENU_IDLE_FPS if idle else sett.MENU_FPS)
+				events = pygame.event.get()
+			else:
+				#Nothing moves, so nothing to draw until something happens
+				events = [pygame.event.wait()] + pygame.event.get()
+			if any(event.type in INPUT_EVENTS for event in events):
+				last_input = pygame.time.get_ticks()
+			game.handle_events(events = events)
+
+	def update(self, dt):
+		pass
+
+
+class TextScene(Scene):
+	#A block of text (credits, how to play) over the sea, rendered once
+	def __init__(self, game, state, text):
+		super().__init__(game, state)
+		self.text = text
+		self.text_surface = None
+
+	def build(self):
+		game = self.game
+		if not game.buttons:
+			scale_width = sett.WIDTH // 10
+			scale_height = sett.HEIGHT // 20
+			game.buttons = [Button("Main Menu", (sett.WIDTH // 2 - scale_width, int(sett.HEIGHT // 1.2)),
+				scale_width * 2, scale_height // 2, sett.HEIGHT)]
+		self.text_surface = render_multiline(self.text, game.font_small, sett.colors["WHITE"])
+
+	def draw_ui(self, surface):
+		surface.blit(self.text_surface, (sett.WIDTH // 2 - self.text_surface.get_width() // 2, sett.HEIGHT // 4))
+		super().draw_ui(surface)
+
+
+class TitleScene(Scene):
+	#Title and menu buttons under clouds drifting in the wind
+	animated = True
+
+	def __init__(self, game, state):
+		super().__init__(game, state)
+		self.clouds = None
+		self.wind = None
+
+	def build(self):
+		game = self.game
+		self.wind = Wind()
+		#The field only needs to cover the screen
+		self.clouds = CloudField(extent = (sett.WIDTH, sett.HEIGHT))
+		self.clouds.spawn(25)
+		if not game.buttons:
+			scale_width = sett.WIDTH // 10
+			scale_height = sett.HEIGHT // 20
+			button_texts = ["New Game", "Load Game", "How to Play", "Credits", "Exit"]
+			game.buttons = [Button(text, (sett.WIDTH // 2 - scale_width, sett.HEIGHT // 2 + i * scale_height),
+				scale_width * 2, scale_height // 2, sett.HEIGHT) for i, text in enumerate(button_texts)]
+
+	def draw_background(self, surface):
+		#Title sits in the background under the clouds, buttons in the UI layer over them
+		super().draw_background(surface)
+		text_surface = text_cache.render(self.game.font_large, "POLYSAIL", sett.colors["WHITE"])
+		surface.blit(text_surface, (sett.WIDTH // 2 - text_surface.get_width() // 2, sett.HEIGHT // 10))
+
+	def draw_dynamic(self, surface):
+		return [cloud.draw(surface, 0, 0) for cloud in self.clouds.visible(0, 0, 50)]
+
+	def draw_ui(self, surface):
+		super().draw_ui(surface)
+		if self.game.load_status:
+			text_surface = text_cache.render(self.game.font_small, self.game.load_status, sett.colors["WHITE"])
+			surface.blit(text_surface, (sett.WIDTH // 2 - text_surface.get_width() // 2, int(sett.HEIGHT * 0.8)))
+
+	def update(self, dt):
+		wind = self.wind
+		wind.update_wind(pygame.time.get_ticks())
+		self.clouds.apply_wind(wind.current_direction, wind.current_speed, dt)
+		self.clouds.interpolate(1)
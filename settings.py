@@ -1,6 +1,84 @@
 
 WIDTH, HEIGHT = 0, 0
 WORLD_WIDTH, WORLD_HEIGHT = 10000, 10000
+GRID_CELL_SIZE = 1000
+SPRITE_CACHE_BUDGET = 64 * 1024 * 1024  #Bytes of cached sprites
+BOAT_ATLAS_STEP = 2  #Degrees between pre-rotated boat frames
+SEAGULL_FLAP_FRAMES = 16  #Wing poses per flap cycle
+BOAT_POLAR = None  #JSON sail/hull profile (python polar.py out.json writes the default to start from), None for the built-in sloop
+WAKE_CAPACITY = 64  #Wake particles kept per boat
+TEXT_CACHE_SIZE = 256  #Rendered text surfaces kept
+CLOUD_SHAPES = 16  #Cloud sprites shared out among all the clouds
+MINIMAP_SCALE = 160  #World units per pixel of the chart's raster
+MINIMAP_SIZE = 250  #Width of the chart on screen
+MINIMAP_RECENTER = 0.4  #How far the boat's chunk gets off the chart's center before it moves, a fraction of the chart's half-width
+
+#Chunked world, the chunks within CHUNK_LOAD_RADIUS of the boat's chunk are kept generated
+CHUNK_SIZE = 4000
+CHUNK_LOAD_RADIUS = 1
+CHUNK_UNLOAD_RADIUS = 2
+ISLANDS_PER_CHUNK = 0.27
+ROCKS_PER_CHUNK = 1.33
+
+#Island outlines: vertices around the full-detail shore, how wobbly it is, and on-screen pixels per vertex for smaller copies
+COASTLINE_VERTICES = 64
+COASTLINE_ROUGHNESS = 0.35
+COASTLINE_LOD_PIXELS = 4
+
+#Wind field: the prevailing wind veered and gusted by a grid of WIND_GRID_SIZE² nodes WIND_CELL_SIZE apart,
+#tiling the world, drifting to a new pattern every WIND_FIELD_PERIOD ms
+WIND_GRID_SIZE = 16
+WIND_CELL_SIZE = 2500
+WIND_FIELD_PERIOD = 20000
+WIND_VEER = 20  #Degrees, standard deviation
+WIND_GUST = 0.25  #Speed factor, standard deviation
+WIND_ROWS_PER_UPDATE = 1  #Rows of the upcoming pattern built per update
+
+#Sailing model of the boat (Boat.apply_wind, Boat.move) and the NPC boats (Fleet.sail_many), rates per second
+SAIL_WIND_PUSH = 0.2  #Target speed per unit of wind at full drive, before the polar's hull cap
+SAIL_ACCELERATION = 0.5  #Toward a higher target speed
+SAIL_DECELERATION = 0.2  #Toward a lower one
+SAIL_DRAG = 0.005  #Fraction of the speed lost
+SAIL_TURN_RATE = 2  #Degrees per degree of rudder, over 1 + speed
+SAIL_HELM_RESPONSE = 3  #Fraction of the gap between the turn and what the rudder asks for closed
+SAIL_WEATHERVANE = 0.001  #Fraction of the wind's angle off the bow the boat swings toward it
+SAIL_DISTANCE_SCALE = 10  #World units sailed per unit of speed
+
+#NPC boats: about FLEET_BOATS_PER_CHUNK set sail from each chunk as it loads and sail between the islands
+FLEET_BOATS_PER_CHUNK = 1.5
+FLEET_LOOKAHEAD = 500  #How far ahead the autopilot watches for rocks and islands
+FLEET_AUTOPILOT_INTERVAL = 200  #ms between helm adjustments
+FLEET_POLAR = None  #Sail/hull profile for the NPC boats, see BOAT_POLAR
+FLEET_COLORS = [(250, 235, 200, 255), (240, 190, 170, 255), (200, 225, 240, 255), (220, 220, 180, 255)]
+
+#Level of detail for clouds, seagulls and NPC boats: within LOD_FULL_RADIUS of the screen center they update every step,
+#within LOD_REDUCED_RADIUS every LOD_REDUCED_INTERVAL steps, further out not at all until they come back in range
+LOD_FULL_RADIUS = 2500
+LOD_REDUCED_RADIUS = 8000
+LOD_REDUCED_INTERVAL = 4
+LOD_MAX_CATCH_UP = 2000  #ms, the most time caught up in one step
+LOD_BUDGET = 1000  #Update cost spent per frame at most, split between its physics steps. A row costs its store's update_cost.
+
+#Simulation runs in fixed steps whatever the frame rate, drawing interpolates between the last two
+PHYSICS_HZ = 60
+CONTROL_RATES = {"adjust_sail": 30, "adjust_rudder": 3, "adjust_reef": 3}  #Per second a control is held, as the per-frame steps were at 60 fps
+MAX_PHYSICS_STEPS = 5  #Per frame, after a long stall the simulation slows down rather than snowballing
+THREADED_SIMULATION = False  #Step the world on a worker thread, the game loop only handles input and drawing
+
+#Menus redraw at MENU_FPS, MENU_IDLE_FPS after MENU_IDLE_AFTER ms without input. Still ones wait for input instead.
+MENU_FPS = 30
+MENU_IDLE_FPS = 10
+MENU_IDLE_AFTER = 10000
+
+#Developer overlay (F3): the last PROFILER_FRAMES frames graphed against the frame budget, frames over PROFILER_HITCH_MS
+#marked as hitches. F4 writes the last PROFILER_TRACE_EVENTS spans as a Chrome trace to Documents.
+PROFILER_FRAMES = 240
+PROFILER_TRACE_EVENTS = 100000
+PROFILER_BUDGET_MS = 1000 / 60
+PROFILER_HITCH_MS = 25
+PROFILER_REFRESH = 250  #ms between overlay redraws
+
+MUSIC_FADE = 2000  #ms each track fades in over
 
 
 colors = {
@@ -10,6 +88,7 @@ colors = {
 "GREY" : (91, 102, 125),
 "LIGHT BLUE" : (100, 200, 255),
 "RED" : (200, 50, 50),
+"SAND" : (230, 210, 150, 255),
 "WHITE" : (250, 250, 250, 255),
 }
 
@@ -17,7 +96,7 @@ colors = {
 credit_text = "Designed and Developed by: Testrunscripts\n \nMade in Pygame\n \nSoundtrack created in Udio"
 
 
-howtoplay_text = """- Hold the left (or press Q) or right side (or press E)\nof the sail pad to trim the sails\n\n- Hold either side of the rudder pad to control the rudder (A and D)\n\n- Hold the left side of the reef pad (or press W) to unreef the sails,\nhold the right side (or press S) to reef them again\n\n- Dock at an island to bring up the menu\n\n- Seagulls can give away island and rock locations"""
+howtoplay_text = """- Hold the left (or press Q) or right side (or press E)\nof the sail pad to trim the sails\n\n- Hold either side of the rudder pad to control the rudder (A and D)\n\n- Hold the left side of the reef pad (or press W) to unreef the sails,\nhold the right side (or press S) to reef them again\n\n- Press M to show or hide the chart of the islands and rocks around you\n\n- Dock at an island to bring up the menu\n\n- Seagulls can give away island and rock locations"""
 
 
 def set_display(info):
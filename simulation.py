@@ -0,0 +1,152 @@
+import copy
+import queue
+import threading
+import time
+
+import settings as sett
+
+from concurrent.futures import Future
+from world import World
+
+
+class Simulation:
+	#Steps the world on the calling thread, each frame steps then draws the live world
+	def __init__(self, world):
+		self.world = world
+
+	def call(self, command):
+		#command(world), returning its result
+		return command(self.world)
+
+	def frame(self, frame_time):
+		#(drawable world, interpolation alpha) for this frame
+		world = self.world
+		alpha = world.advance(frame_time, world.boat.x - sett.WIDTH // 2, world.boat.y - sett.HEIGHT // 2)
+		return world, alpha
+
+	def send(self, command):
+		#command(world), result not needed
+		command(self.world)
+
+	def start(self):
+		pass
+
+	def stop(self):
+		pass
+
+
+class SimulationThread(threading.Thread):
+	#Steps the world on a worker, the main thread only draws the snapshots it publishes.
+	#Input reaches the world as commands, run between steps. An exception in a step or command stops the worker,
+	#fails the calls waiting on it and is raised again on the main thread by the next frame or call.
+	def __init__(self, world):
+		super().__init__(daemon = True)
+		self.commands = queue.Queue()
+		self.error = None
+		self.running = True
+		self.snapshot = Snapshot(world)
+		self.world = world
+
+	def call(self, command):
+		if self.error:
+			raise self.error
+		future = Future()
+		self.commands.put((command, future))
+		if self.error:
+			#The worker may have failed the queue before this landed in it
+			self.fail_commands()
+		return future.result()
+
+	def fail_commands(self):
+		while True:
+			try:
+				_, future = self.commands.get_nowait()
+			except queue.Empty:
+				return
+			if future:
+				future.set_exception(self.error)
+
+	def frame(self, frame_time):
+		if self.error:
+			raise self.error
+		snapshot = self.snapshot
+		return snapshot, snapshot.alpha()
+
+	def run(self):
+		world = self.world
+		step = 1 / sett.PHYSICS_HZ
+		last = time.perf_counter()
+		try:
+			while self.running:
+				self.run_commands()
+				now = time.perf_counter()
+				frame_time, last = now - last, now
+				world.advance(frame_time, world.boat.x - sett.WIDTH // 2, world.boat.y - sett.HEIGHT // 2)
+				#Swapping the reference is atomic, the main thread never sees a half-built snapshot
+				self.snapshot = Snapshot(world)
+				#Sleep until the next step is due
+				time.sleep(max(0, step - world.accumulator))
+			self.run_commands()
+		except Exception as e:
+			self.error = e
+			self.fail_commands()
+
+	def run_commands(self):
+		while True:
+			try:
+				command, future = self.commands.get_nowait()
+			except queue.Empty:
+				return
+			try:
+				result = command(self.world)
+			except Exception as e:
+				#A sent command has no one waiting on it, it stops the worker as it would the inline simulation
+				if not future:
+					raise
+				future.set_exception(e)
+			else:
+				if future:
+					future.set_result(result)
+
+	def send(self, command):
+		if self.error:
+			raise self.error
+		self.commands.put((command, None))
+
+	def stop(self):
+		self.running = False
+		if self.is_alive():
+			self.join()
+
+
+class Snapshot:
+	#Read-only copy of what drawing needs from the world at one moment
+	def __init__(self, world):
+		self.accumulator = world.accumulator
+		self.boat = copy.copy(world.boat)
+		self.boat.wakes = world.boat.wakes.copy()
+		self.boat_wind = world.boat_wind
+		self.clouds = world.clouds.freeze()
+		self.fleet = world.fleet.freeze()
+		#Rebuilt rather than changed in place when chunks load, so safe to share
+		self.islands = world.islands
+		self.profiler = world.profiler
+		self.published = time.perf_counter()
+		self.rocks = world.rocks
+		self.seagulls = world.seagulls.freeze()
+		self.time = world.time
+		self.wind = copy.copy(world.wind)
+
+	def alpha(self):
+		#The world keeps stepping after publishing, extrapolate the accumulator to now
+		step = 1 / sett.PHYSICS_HZ
+		return min(1, (self.accumulator + time.perf_counter() - self.published) / step)
+
+	#Same layers as World draws, from the copies
+	draw_dynamic = World.draw_dynamic
+
+	def draw_static(self, screen, cam_x, cam_y):
+		for rock in self.rocks:
+			rock.draw(screen, cam_x, cam_y)
+		for island in self.islands:
+			island.draw(screen, cam_x, cam_y)
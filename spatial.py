@@ -0,0 +1,79 @@
+import math
+import numpy as np
+
+import settings as sett
+
+
+class SpatialGrid:
+	def __init__(self, cell_size = None):
+		self.cell_size = cell_size or sett.GRID_CELL_SIZE
+		self.arrays = {}  #Cell: its objects' x, y and size as one array, made when first asked for
+		self.cells = {}
+		self.object_cells = {}
+
+	def __len__(self):
+		return len(self.object_cells)
+
+	def cell_keys(self, x0, y0, x1, y1):
+		size = self.cell_size
+		min_cx, max_cx = math.floor(x0 / size), math.floor(x1 / size)
+		min_cy, max_cy = math.floor(y0 / size), math.floor(y1 / size)
+		return [(cx, cy) for cx in range(min_cx, max_cx + 1) for cy in range(min_cy, max_cy + 1)]
+
+	def cell_arrays(self, x0, y0, x1, y1):
+		#Arrays of (x, y, size) rows for the cells the rect covers, an object in several of them is in each array
+		arrays = []
+		for key in self.cell_keys(x0, y0, x1, y1):
+			array = self.arrays.get(key)
+			if array is None:
+				cell = self.cells.get(key)
+				if not cell:
+					continue
+				array = self.arrays[key] = np.array([(obj.x, obj.y, obj.size) for obj in cell], float)
+			arrays.append(array)
+		return arrays
+
+	def clear(self):
+		self.arrays = {}
+		self.cells = {}
+		self.object_cells = {}
+
+	def insert(self, obj):
+		if obj in self.object_cells:
+			self.remove(obj)
+		keys = self.cell_keys(obj.x - obj.size, obj.y - obj.size, obj.x + obj.size, obj.y + obj.size)
+		for key in keys:
+			self.cells.setdefault(key, []).append(obj)
+			self.arrays.pop(key, None)
+		self.object_cells[obj] = keys
+
+	def remove(self, obj):
+		keys = self.object_cells.pop(obj, None)
+		if keys is None:
+			return
+		for key in keys:
+			self.arrays.pop(key, None)
+			cell = self.cells[key]
+			cell.remove(obj)
+			if not cell:
+				del self.cells[key]
+
+	def query(self, x0, y0, x1, y1):
+		#Objects whose bounding box overlaps the rect, each returned once
+		found = []
+		seen = set()
+		cells = self.cells
+		for key in self.cell_keys(x0, y0, x1, y1):
+			cell = cells.get(key)
+			if not cell:
+				continue
+			for obj in cell:
+				if obj in seen:
+					continue
+				seen.add(obj)
+				if obj.x + obj.size >= x0 and obj.x - obj.size <= x1 and obj.y + obj.size >= y0 and obj.y - obj.size <= y1:
+					found.append(obj)
+		return found
+
+	def query_radius(self, x, y, radius):
+		return self.query(x - radius, y - radius, x + radius, y + radius)
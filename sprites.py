@@ -0,0 +1,54 @@
+import pygame
+
+import settings as sett
+
+from collections import OrderedDict
+
+
+class SpriteCache:
+	#Pre-rendered surfaces (or lists of frames) by key, least recently used dropped first once over the byte budget
+	def __init__(self, budget = None):
+		self.budget = budget or sett.SPRITE_CACHE_BUDGET
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.used = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def clear(self):
+		self.entries.clear()
+		self.used = 0
+
+	def get(self, key, build):
+		entry = self.entries.get(key)
+		if entry is not None:
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return entry
+		self.misses += 1
+		entry = build()
+		entry = [self.prepare(frame) for frame in entry] if isinstance(entry, list) else self.prepare(entry)
+		self.entries[key] = entry
+		self.used += entry_bytes(entry)
+		while self.used > self.budget and len(self.entries) > 1:
+			_, old = self.entries.popitem(last = False)
+			self.used -= entry_bytes(old)
+		return entry
+
+	def prepare(self, surface):
+		#Match the display format once a window exists, RLE makes the transparent corners nearly free
+		if pygame.display.get_init() and pygame.display.get_surface():
+			surface = surface.convert_alpha()
+			surface.set_alpha(255, pygame.RLEACCEL)
+		return surface
+
+
+def entry_bytes(entry):
+	if isinstance(entry, list):
+		return sum(entry_bytes(frame) for frame in entry)
+	return entry.get_width() * entry.get_height() * entry.get_bytesize()
+
+
+sprite_cache = SpriteCache()
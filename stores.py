@@ -0,0 +1,201 @@
+import copy
+import math
+import random
+
+import numpy as np
+
+import settings as sett
+
+from objects import Cloud, Seagull
+
+
+class EntityStore:
+	#(Column name, dtype); each entity is one row, its view object holds the row index
+	fields = ()
+	#Column values for appended rows that don't give one, otherwise 0
+	defaults = {}
+
+	frozen = False
+	#Moves per step bigger than this (wrapping, respawns) snap instead of sliding across the screen
+	max_step = 100
+
+	def __init__(self, seed = None):
+		self.rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+		self.views = []
+		for name, dtype in self.fields:
+			setattr(self, name, np.zeros(0, dtype))
+		self.draw_x, self.draw_y = self.x, self.y
+		self.generation = 0
+		self.prev_generation = None
+		self.prev_x, self.prev_y = self.x, self.y
+
+	def __len__(self):
+		return len(self.views)
+
+	def __iter__(self):
+		return iter(self.views)
+
+	def append(self, count, view_class, **columns):
+		start = len(self.views)
+		for name, dtype in self.fields:
+			column = np.broadcast_to(np.asarray(columns.get(name, self.defaults.get(name, 0)), dtype), (count,))
+			setattr(self, name, np.concatenate((getattr(self, name), column)))
+		views = [view_class(self, index) for index in range(start, start + count)]
+		self.views.extend(views)
+		self.generation += 1
+		return views
+
+	def clear(self):
+		self.remove(self.views)
+
+	def remove(self, views):
+		keep = np.ones(len(self.views), bool)
+		for view in views:
+			keep[view.index] = False
+		for name, _ in self.fields:
+			setattr(self, name, getattr(self, name)[keep])
+		self.views = [view for view, kept in zip(self.views, keep) if kept]
+		for index, view in enumerate(self.views):
+			view.index = index
+		self.generation += 1
+
+	def freeze(self):
+		#Read-only copy for another thread to draw from
+		frozen = copy.copy(self)
+		for name in [name for name, _ in self.fields] + ["prev_x", "prev_y"]:
+			column = getattr(self, name).copy()
+			column.flags.writeable = False
+			setattr(frozen, name, column)
+		frozen.frozen = True
+		frozen.views = list(self.views)
+		return frozen
+
+	def interpolate(self, alpha):
+		#Sets the positions views draw at, alpha of the way from the previous step to this one
+		if alpha >= 1 or self.prev_generation != self.generation:
+			#Rows were added or removed since, nothing to line up with
+			self.draw_x, self.draw_y = self.x, self.y
+			return
+		dx, dy = self.x - self.prev_x, self.y - self.prev_y
+		snap = (np.abs(dx) > self.max_step) | (np.abs(dy) > self.max_step)
+		self.draw_x = np.where(snap, self.x, self.prev_x + dx * alpha)
+		self.draw_y = np.where(snap, self.y, self.prev_y + dy * alpha)
+
+	def store_previous(self):
+		self.prev_generation = self.generation
+		self.prev_x, self.prev_y = self.x.copy(), self.y.copy()
+
+	def visible(self, cam_x, cam_y, size):
+		#Views whose bounding box overlaps the screen at their interpolated position
+		offset_x = self.draw_x - cam_x
+		offset_y = self.draw_y - cam_y
+		mask = (offset_x + size >= 0) & (offset_x - size <= sett.WIDTH) & (offset_y + size >= 0) & (offset_y - size <= sett.HEIGHT)
+		index = np.flatnonzero(mask).tolist()
+		if not self.frozen:
+			return [self.views[i] for i in index]
+		#The live views keep being reindexed on the simulation thread, draw through copies bound to this store
+		views = [copy.copy(self.views[i]) for i in index]
+		for i, view in zip(index, views):
+			view.store, view.index = self, i
+		return views
+
+
+class CloudField(EntityStore):
+	fields = (("x", np.float64), ("y", np.float64), ("updated", np.float64), ("shape", np.int64))
+	defaults = {"updated": np.nan}
+	update_cost = 1
+
+	def __init__(self, seed = None, extent = None):
+		super().__init__(seed)
+		#Half width and height of the field, the world's unless given (the menus use the screen's)
+		self.extent = extent
+
+	def apply_wind(self, direction, speed, dt, center_x = 0, center_y = 0, index = None):
+		#direction and speed: one wind for all, or one per cloud. With index only those clouds drift and wrap,
+		#the wind and dt (one or one each) are theirs.
+		if index is None:
+			index = np.arange(len(self.views))
+		count = len(index)
+		if count:
+			#Convert compass direction (0° = north/up) to Pygame radians (0 = right)
+			rad = np.radians((direction - 90) % 360)
+			speed_factor = 0.05
+			#Tuned per 1/60 s
+			rate = dt * 60
+			#Drift plus a tiny random sway
+			self.x[index] += (np.cos(rad) * speed * speed_factor + self.rng.uniform(-0.2, 0.2, count)) * rate
+			self.y[index] += (np.sin(rad) * speed * speed_factor + self.rng.uniform(-0.2, 0.2, count)) * rate
+			self.wrap(center_x, center_y, index)
+
+	def get_extent(self):
+		return self.extent or (sett.WORLD_WIDTH, sett.WORLD_HEIGHT)
+
+	def spawn(self, count, center_x = 0, center_y = 0):
+		width, height = self.get_extent()
+		x = self.rng.uniform(center_x - width, center_x + width, count)
+		y = self.rng.uniform(center_y - height, center_y + height, count)
+		return self.append(count, Cloud, x = x, y = y, shape = self.rng.integers(sett.CLOUD_SHAPES, size = count))
+
+	def wrap(self, center_x = 0, center_y = 0, index = slice(None)):
+		#Keep within the extent around the center (the boat in game, the screen in menus)
+		width, height = self.get_extent()
+		left, top = center_x - width, center_y - height
+		self.x[index] = np.mod(self.x[index] - left, 2 * width) + left
+		self.y[index] = np.mod(self.y[index] - top, 2 * height) + top
+
+
+class Flock(EntityStore):
+	fields = (
+		("x", np.float64),
+		("y", np.float64),
+		("orientation", np.float64),
+		("speed", np.float64),
+		("flap_phase", np.float64),
+		("home_x", np.float64),
+		("home_y", np.float64),
+		("max_radius", np.float64),
+		("interval", np.int64),
+		("last_change", np.int64),
+		("updated", np.float64),
+	)
+	defaults = {"updated": np.nan}
+	update_cost = 1
+
+	def spawn(self, home_x, home_y, count, max_radius = 500):
+		rng = self.rng
+		half = max_radius // 2
+		return self.append(count, Seagull,
+			#Start near home
+			x = home_x + rng.integers(-half, half, count, endpoint = True),
+			y = home_y + rng.integers(-half, half, count, endpoint = True),
+			orientation = rng.integers(0, 360, count, endpoint = True),
+			speed = rng.uniform(1.5, 3.0, count),
+			flap_phase = rng.uniform(0, 2 * math.pi, count),
+			home_x = home_x,
+			home_y = home_y,
+			max_radius = max_radius,
+			interval = rng.integers(1500, 2500, count, endpoint = True),
+		)
+
+	def update(self, index, dt, time):
+		#Flies the gulls in index, dt one for all or one each (see lod.py)
+		if not len(index):
+			return
+		#Tuned per 1/60 s
+		rate = dt * 60
+		self.flap_phase[index] = (self.flap_phase[index] + self.speed[index] * 0.05 * rate) % (2 * math.pi)
+
+		#Flying
+		rad = np.radians(self.orientation[index])
+		self.x[index] += self.speed[index] * 0.75 * rate * np.cos(rad)
+		self.y[index] += self.speed[index] * 0.75 * rate * np.sin(rad)
+
+		#Check distance from home
+		dx = self.x[index] - self.home_x[index]
+		dy = self.y[index] - self.home_y[index]
+		away = dx * dx + dy * dy > self.max_radius[index] ** 2
+		#Force orientation back toward home
+		self.orientation[index[away]] = np.degrees(np.arctan2(-dy[away], -dx[away]))
+		turn = index[~away & (time - self.last_change[index] > self.interval[index])]
+		self.last_change[turn] = time
+		self.orientation[turn] = self.rng.integers(0, 360, len(turn), endpoint = True)
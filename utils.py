@@ -1,13 +1,20 @@
 
 import math
 import os
-import pickle
 import pygame
+import threading
 
+import savefile
 import settings as sett
+
+from collections import OrderedDict
+
+
+FONTS = {}
 	
 	
-def bounce_back(entity, obstacle):
+def bounce_back(entity, obstacle, radius = None):
+	#radius: how far the obstacle reaches toward the entity, its size for a circle
 	if entity.stopped:
 		return
 
@@ -18,31 +25,18 @@ def bounce_back(entity, obstacle):
 	if dist == 0:
 		return
 	nx, ny = dx / dist, dy / dist
-	overlap = (obstacle.size + entity.size) - dist
+	overlap = ((obstacle.size if radius is None else radius) + entity.size) - dist
+	if overlap > 0:
+		entity.x += nx * overlap
+		entity.y += ny * overlap
 
 	#Flip and stop
 	entity.orientation = (entity.orientation + 180) % 360
 	entity.speed *= 0.75
 	
 	
-def cleanup_for_save(obj):
-	if isinstance(obj, pygame.Surface):
-		return None
-	if isinstance(obj, list):
-		return [cleanup_for_save(o) for o in obj]
-	if isinstance(obj, dict):
-		return {k: cleanup_for_save(v) for k, v in obj.items()}
-	if hasattr(obj, "__dict__"):
-		for k, v in vars(obj).items():
-			if isinstance(v, pygame.Surface):
-				setattr(obj, k, None)
-			elif isinstance(v, (list, dict)) or hasattr(v, "__dict__"):
-				cleanup_for_save(v)
-	return obj
-	
-	
 def display_info(screen, boat):
-	font = pygame.font.Font(None, 40)
+	font = get_font(40)
 	info_text = [
 		f"Position: ({int(math.ceil(boat.x / 1000))}, {int(math.ceil(boat.y / 1000))})",
 		" ",
@@ -56,21 +50,21 @@ def display_info(screen, boat):
 		" ",
 		f"Reef: {round(boat.reef, 2)}"
 	]
-	for i, text in enumerate(info_text):
-		rendered_text = font.render(text, True, sett.colors["WHITE"])
-		screen.blit(rendered_text, (10, 10 + i * 20))
+	rects = [screen.blit(text_cache.render(font, text, sett.colors["WHITE"]), (10, 10 + i * 20)) for i, text in enumerate(info_text) if text != " "]
+	return rects[0].unionall(rects[1:])
 			
 			
 def draw_touch_controls(screen):
-	font = pygame.font.Font(None, 24)
-	screen.blit(font.render("Sail Angle", True, sett.colors["WHITE"]), (0.05 * sett.WIDTH, sett.HEIGHT - 0.15 * sett.HEIGHT - 20))
-	screen.blit(font.render("Rudder", True, sett.colors["WHITE"]), (0.35 * sett.WIDTH, sett.HEIGHT - 0.15 * sett.HEIGHT - 20))
-	screen.blit(font.render("Reef", True, sett.colors["WHITE"]), (0.65 * sett.WIDTH, sett.HEIGHT - 0.15 * sett.HEIGHT - 20))
+	font = get_font(24)
+	screen.blit(text_cache.render(font, "Sail Angle", sett.colors["WHITE"]), (0.05 * sett.WIDTH, sett.HEIGHT - 0.15 * sett.HEIGHT - 20))
+	screen.blit(text_cache.render(font, "Rudder", sett.colors["WHITE"]), (0.35 * sett.WIDTH, sett.HEIGHT - 0.15 * sett.HEIGHT - 20))
+	screen.blit(text_cache.render(font, "Reef", sett.colors["WHITE"]), (0.65 * sett.WIDTH, sett.HEIGHT - 0.15 * sett.HEIGHT - 20))
 	
 	
 def draw_wind_rose(surface, center, size, direction_angle, speed, font_small, font_large):
 	directions = ["N", "E", "S", "W"]
 	angle_offset = math.pi / 2
+	rects = []
 
 	#Draw cardinal lines and labels
 	for i, direction in enumerate(directions):
@@ -78,16 +72,16 @@ def draw_wind_rose(surface, center, size, direction_angle, speed, font_small, fo
 		dx = int(math.cos(angle) * size)
 		dy = int(math.sin(angle) * size)
 		end_pos = (center[0] + dx, center[1] + dy)
-		pygame.draw.line(surface, sett.colors["WHITE"], center, end_pos, 2)
+		rects.append(pygame.draw.line(surface, sett.colors["WHITE"], center, end_pos, 2))
 
-		label = font_small.render(direction, True, sett.colors["WHITE"])
+		label = text_cache.render(font_small, direction, sett.colors["WHITE"])
 		label_rect = label.get_rect(center=(center[0] + dx * 1.2, center[1] + dy * 1.2))
-		surface.blit(label, label_rect)
+		rects.append(surface.blit(label, label_rect))
 
 	#Draw speed beside rose
-	speed_text = font_large.render(str(round(speed * 1.5)), True, sett.colors["WHITE"])
+	speed_text = text_cache.render(font_large, str(round(speed * 1.5)), sett.colors["WHITE"])
 	speed_rect = speed_text.get_rect(center=(center[0] + size * 3, center[1]))
-	surface.blit(speed_text, speed_rect)
+	rects.append(surface.blit(speed_text, speed_rect))
 
 	#Center marker
 	pygame.draw.circle(surface, sett.colors["RED"], center, 5)
@@ -99,17 +93,28 @@ def draw_wind_rose(surface, center, size, direction_angle, speed, font_small, fo
 	arrow_dy = int(math.sin(angle_radians) * arrow_length)
 	arrow_tip = (center[0] + arrow_dx, center[1] + arrow_dy)
 
-	pygame.draw.line(surface, sett.colors["RED"], center, arrow_tip, 3)
+	rects.append(pygame.draw.line(surface, sett.colors["RED"], center, arrow_tip, 3))
 
 	#Arrowhead
 	head_size = 10
 	for offset in (math.pi / 6, -math.pi / 6):
 		hx = int(math.cos(angle_radians + offset) * head_size)
 		hy = int(math.sin(angle_radians + offset) * head_size)
-		pygame.draw.line(surface, sett.colors["RED"], arrow_tip, (arrow_tip[0] - hx, arrow_tip[1] - hy), 3)
+		rects.append(pygame.draw.line(surface, sett.colors["RED"], arrow_tip, (arrow_tip[0] - hx, arrow_tip[1] - hy), 3))
+	return rects[0].unionall(rects[1:])
 		
 		
-def get_save_path(filename="save_main.pkl"):
+def get_font(size):
+	#Fonts are built once per size and shared, the font module started with the first
+	font = FONTS.get(size)
+	if font is None:
+		if not pygame.font.get_init():
+			pygame.font.init()
+		font = FONTS[size] = pygame.font.Font(None, size)
+	return font
+	
+	
+def get_save_path(filename="save_main.psav"):
 	doc_folder = os.path.join(os.path.expanduser("~"), "Documents")
 	if not os.path.exists(doc_folder):
 		os.makedirs(doc_folder)
@@ -125,33 +130,40 @@ def get_stop_btns():
 	return buttons
 	
 	
-def load_game():
-	save_path = get_save_path()
-	if os.path.exists(save_path):
-		with open(save_path, "rb") as f:
-			state = pickle.load(f)
-			return state
-	return None
+def load_game(file="save_main.psav", task=None):
+	save_path = get_save_path(file)
+	if not os.path.exists(save_path):
+		raise FileNotFoundError("No saved game yet")
+	size = max(1, os.path.getsize(save_path))
+	data = bytearray()
+	with open(save_path, "rb") as f:
+		for block in iter(lambda: f.read(256 * 1024), b""):
+			data += block
+			if task:
+				task.progress = 0.8 * len(data) / size
+	return savefile.unpack(data)
 	
 	
-def render_multiline(screen, text, font, color):
-	width = screen.get_width()
-	lines = text.splitlines()
+def render_multiline(text, font, color):
+	#Every line centered on one surface, rendered once and blitted as a block
+	lines = [font.render(line, True, color) for line in text.splitlines()]
+	width = max((line.get_width() for line in lines), default = 0)
+	surface = pygame.Surface((width, len(lines) * font.get_height()), pygame.SRCALPHA)
 	for i, line in enumerate(lines):
-		text_surface = font.render(line, True, color)
-		offset_x = int(width // 2) - (text_surface.get_width() // 2)
-		offset_y = int((sett.HEIGHT // 4) + (i * font.get_height()))
-		screen.blit(text_surface, (offset_x, offset_y))
+		surface.blit(line, ((width - line.get_width()) // 2, i * font.get_height()))
+	return surface
 		
 		
-def save_game(file="save_main.pkl", **kwargs):
-	for obj in kwargs.values():
-		obj = cleanup_for_save(obj)
-		if hasattr(obj, "wakes"):
-			obj.wakes = []
+def save_game(tables, file="save_main.psav", task=None):
+	data = savefile.pack(tables)
 	save_path = get_save_path(file)
-	with open(save_path, "wb") as f:
-		pickle.dump(kwargs, f)
+	#Write beside the save and swap it in, so a crash never leaves half a file
+	temp_path = save_path + ".tmp"
+	with open(temp_path, "wb") as f:
+		f.write(data)
+		f.flush()
+		os.fsync(f.fileno())
+	os.replace(temp_path, save_path)
 		
 		
 def wind_drift(entity, wind):
@@ -165,10 +177,29 @@ def wind_drift(entity, wind):
 	entity.orientation = (entity.orientation - angle_diff * turn_rate) % 360
 		
 		
+class BackgroundTask(threading.Thread):
+	#Runs target(*args, task=self) off the main thread and posts event_type with result/error when done
+	def __init__(self, event_type, target, *args):
+		super().__init__(daemon = True)
+		self.args = args
+		self.event_type = event_type
+		self.function = target
+		self.progress = 0.0
+
+	def run(self):
+		result, error = None, None
+		try:
+			result = self.function(*self.args, task = self)
+		except Exception as e:
+			error = e
+		self.progress = 1.0
+		pygame.event.post(pygame.event.Event(self.event_type, result = result, error = error, task = self))
+		
+		
 class Button:
 	def __init__(self, text, pos, width, height, screen_height, color = None, states = None):
 		self.color = color or sett.colors["BLUE"]
-		self.font = pygame.font.Font(None, int(screen_height * 0.02))
+		self.font = get_font(int(screen_height * 0.02))
 		self.rect = pygame.Rect(pos[0], pos[1], width, height)
 		self.text = text
 		# Pre-render text once
@@ -185,3 +216,28 @@ class Button:
 	def draw(self, screen):
 		pygame.draw.rect(screen, self.color, self.rect)
 		screen.blit(self.text_surface, self.text_rect)
+		
+		
+class TextCache:
+	#Rendered text by (font, text, colors), least recently used dropped past capacity
+	def __init__(self, capacity = None):
+		self.capacity = capacity or sett.TEXT_CACHE_SIZE
+		self.entries = OrderedDict()
+		
+	def __len__(self):
+		return len(self.entries)
+		
+	def render(self, font, text, color, background = None):
+		key = (font, text, tuple(color), background and tuple(background))
+		surface = self.entries.get(key)
+		if surface is not None:
+			self.entries.move_to_end(key)
+			return surface
+		surface = font.render(text, True, color, background)
+		self.entries[key] = surface
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last = False)
+		return surface
+		
+		
+text_cache = TextCache()
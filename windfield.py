@@ -0,0 +1,75 @@
+import numpy as np
+
+import settings as sett
+
+
+class WindField:
+	#Local veer and gust on top of the prevailing wind, from a coarse grid that tiles the world.
+	#The grid blends from one seeded pattern (keyframe) to the next every WIND_FIELD_PERIOD ms,
+	#the one after that is built a few rows per update so no single step pays for a whole grid.
+	def __init__(self, seed, size = None, cell_size = None):
+		self.cell_size = cell_size or sett.WIND_CELL_SIZE
+		self.grid = None
+		self.key = None
+		self.next = None
+		self.pending = None
+		self.pending_rows = 0
+		self.previous = None
+		self.seed = seed
+		self.size = size or sett.WIND_GRID_SIZE
+
+	def fill(self, rows):
+		#More rows of the keyframe after next
+		while rows > 0 and self.pending_rows < self.size:
+			self.pending[:, self.pending_rows] = self.keyframe_row(self.key + 2, self.pending_rows)
+			self.pending_rows += 1
+			rows -= 1
+
+	def keyframe(self, key):
+		grid = np.empty((2, self.size, self.size))
+		for row in range(self.size):
+			grid[:, row] = self.keyframe_row(key, row)
+		return grid
+
+	def keyframe_row(self, key, row):
+		#(veer in degrees, speed factor) for one row of nodes, the same for a given seed whenever it's built
+		rng = np.random.default_rng((self.seed, key, row))
+		veer = np.clip(rng.normal(0, sett.WIND_VEER, self.size), -2 * sett.WIND_VEER, 2 * sett.WIND_VEER)
+		gust = np.clip(rng.normal(1, sett.WIND_GUST, self.size), 0.2, 2)
+		return veer, gust
+
+	def sample(self, x, y, direction, speed):
+		#Wind (direction, speed) at world positions, any number at once
+		size = self.size
+		gx = np.asarray(x, float) / self.cell_size
+		gy = np.asarray(y, float) / self.cell_size
+		x0, y0 = np.floor(gx), np.floor(gy)
+		fx, fy = gx - x0, gy - y0
+		i0 = x0.astype(np.intp) % size
+		i1 = (i0 + 1) % size
+		row0 = y0.astype(np.intp) % size * size
+		row1 = (row0 + size) % (size * size)
+		#Bilinear over the flattened (veer, gust) grid, all four corners of both in one gather
+		corners = self.grid.take(np.concatenate((row0 + i0, row0 + i1, row1 + i0, row1 + i1)), axis = 1).reshape(2, 4, -1)
+		top = corners[:, 0] + (corners[:, 1] - corners[:, 0]) * fx
+		bottom = corners[:, 2] + (corners[:, 3] - corners[:, 2]) * fx
+		veer, gust = top + (bottom - top) * fy
+		return (direction + veer) % 360, speed * gust
+
+	def update(self, time):
+		key, phase = divmod(time / sett.WIND_FIELD_PERIOD, 1)
+		key = int(key)
+		if self.key is None or key not in (self.key, self.key + 1):
+			#First use, or the clock jumped (a load): build what's needed now
+			self.key = key
+			self.previous, self.next = self.keyframe(key), self.keyframe(key + 1)
+			self.pending = np.empty_like(self.previous)
+			self.pending_rows = 0
+		elif key == self.key + 1:
+			#Roll over, finishing the pending keyframe if the row budget didn't
+			self.fill(self.size)
+			self.previous, self.next, self.pending = self.next, self.pending, self.previous
+			self.key = key
+			self.pending_rows = 0
+		self.fill(sett.WIND_ROWS_PER_UPDATE)
+		self.grid = (self.previous + (self.next - self.previous) * phase).reshape(2, -1)
@@ -0,0 +1,298 @@
+import numpy as np
+import random
+
+import settings as sett
+
+from chunks import ChunkManager
+from collision import sweep, sweep_bounds
+from fleet import Fleet
+from lod import LODScheduler
+from objects import Boat, Island, Rock, Wind
+from profiler import NullProfiler
+from savefile import iter_rows
+from spatial import SpatialGrid
+from stores import CloudField, Flock
+from utils import bounce_back
+from windfield import WindField
+
+
+class World:
+	def __init__(self, profiler = None):
+		self.accumulator = 0
+		self.boat = None
+		self.boat_wind = (0, 0)
+		self.chunks = None
+		self.clouds = CloudField()
+		self.controls = {}  #Boat control held: direction (1 or -1), applied every step at CONTROL_RATES
+		self.docked = None
+		self.fleet = None
+		self.islands = []
+		self.island_grid = SpatialGrid()
+		self.lod = None
+		self.profiler = profiler or NullProfiler()
+		self.rocks = []
+		self.rock_grid = SpatialGrid()
+		self.seagulls = Flock()
+		self.seed = None
+		self.spawn = (0, 0)
+		self.time = 0  #Simulation clock in ms, advances only with physics steps
+		self.wind = None
+		self.wind_field = None
+
+	def add_chunk(self, chunk):
+		for island in chunk.islands:
+			self.island_grid.insert(island)
+		for rock in chunk.rocks:
+			self.rock_grid.insert(rock)
+		for x, y, count, max_radius in chunk.nests:
+			chunk.seagulls.extend(self.seagulls.spawn(x, y, count, max_radius))
+		#Seeded apart from the chunk itself, so saved chunks get the same boats back and old seeds keep their islands
+		rng = random.Random(f"{self.seed}:{chunk.cx}:{chunk.cy}:fleet")
+		self.fleet.launch(chunk, rng, self.chunks.roll_count(rng, sett.FLEET_BOATS_PER_CHUNK), self.chunks.chunk_size, int(self.time))
+
+	def advance(self, frame_time, cam_x, cam_y):
+		#Runs the fixed steps the frame time covers, returns how far (0-1) drawing is into the next one
+		step = 1 / sett.PHYSICS_HZ
+		self.accumulator = min(self.accumulator + frame_time, step * sett.MAX_PHYSICS_STEPS)
+		self.lod.begin_frame(int(self.accumulator / step))
+		docked = None
+		while self.accumulator >= step:
+			self.update(step, int(self.time), cam_x, cam_y)
+			docked = docked or self.docked
+			self.time += step * 1000
+			self.accumulator -= step
+		self.docked = docked
+		return self.accumulator / step
+
+	def generate(self, boat_x, boat_y, seed = None, clouds = None):
+		self.seed = random.getrandbits(32) if seed is None else seed
+		self.spawn = (boat_x, boat_y)
+		self.chunks = ChunkManager(self.seed, boat_x, boat_y)
+		self.boat = Boat(x = boat_x, y = boat_y)
+		self.wind = Wind()
+		self.wind_field = WindField(self.seed)
+		self.fleet = Fleet(self.seed)
+		self.lod = LODScheduler((self.clouds, self.seagulls, self.fleet))
+		self.spawn_clouds(clouds)
+		self.update_chunks()
+		self.update_wind(int(self.time), [], [])
+
+	def hold(self, controls):
+		#{Boat adjust method: direction} for the controls the player is holding, nothing for none
+		self.controls = controls
+
+	def load_state(self, tables):
+		world = tables["world"]
+		self.seed = world["seed"][0]
+		self.spawn = (world["spawn_x"][0], world["spawn_y"][0])
+		self.time = world["time"][0]
+		self.chunks = ChunkManager(self.seed, *self.spawn, chunk_size = world["chunk_size"][0] or None)
+
+		boat = iter_rows(tables["boat"])[0]
+		self.boat = Boat(x = boat["x"], y = boat["y"])
+		for name in ("orientation", "last_orientation", "speed", "acceleration", "angular_velocity", "reef", "rudder", "sail", "wake_timer"):
+			setattr(self.boat, name, boat[name])
+		self.boat.stopped = bool(boat["stopped"])
+		self.wind = Wind()
+		for name, value in iter_rows(tables["wind"])[0].items():
+			setattr(self.wind, name, value)
+		#Older saves stamped it with the session's clock
+		self.wind.last_change = min(self.wind.last_change, int(self.time))
+		self.wind_field = WindField(self.seed)
+		self.fleet = Fleet(self.seed)
+		self.lod = LODScheduler((self.clouds, self.seagulls, self.fleet))
+
+		#Saved chunks come back as they were, the rest of the neighbourhood is generated
+		contents = [((chunk["cx"], chunk["cy"]), [], [], []) for chunk in iter_rows(tables["chunks"])]
+		for island in iter_rows(tables["islands"]):
+			contents[island["chunk"]][1].append(Island(name=island["name"], x=island["x"], y=island["y"], size=island["size"]))
+		for rock in iter_rows(tables["rocks"]):
+			contents[rock["chunk"]][2].append(Rock(x=rock["x"], y=rock["y"], size=rock["size"]))
+		for nest in iter_rows(tables["nests"]):
+			contents[nest["chunk"]][3].append((nest["x"], nest["y"], nest["count"], nest["max_radius"]))
+		for (cx, cy), islands, rocks, nests in contents:
+			self.add_chunk(self.chunks.restore(cx, cy, islands, rocks, nests))
+		self.spawn_clouds()
+		self.update_chunks(force = True)
+		self.update_wind(int(self.time), [], [])
+
+		if self.boat.stopped:
+			#Dock at the island the boat was saved at
+			for island in self.island_grid.query_radius(boat["island_x"], boat["island_y"], 1):
+				if (island.x, island.y) == (boat["island_x"], boat["island_y"]):
+					self.boat.island = island
+			if not self.boat.island:
+				self.boat.stopped = False
+		self.store_previous()
+
+	def remove_chunk(self, chunk):
+		for island in chunk.islands:
+			self.island_grid.remove(island)
+		for rock in chunk.rocks:
+			self.rock_grid.remove(rock)
+		self.seagulls.remove(chunk.seagulls)
+		chunk.seagulls = []
+
+	def spawn_clouds(self, count = None):
+		count = int(sett.WORLD_HEIGHT / 200) if count is None else count
+		self.clouds.clear()
+		self.clouds.spawn(count, self.boat.x, self.boat.y)
+
+	def store_previous(self):
+		#What drawing interpolates from
+		self.boat.store_previous()
+		self.clouds.store_previous()
+		self.fleet.store_previous()
+		self.seagulls.store_previous()
+
+	def snapshot(self):
+		#Plain column tables for savefile.pack, read without touching the live objects
+		boat, wind = self.boat, self.wind
+		island = boat.island
+		tables = {
+			"world": {"seed": [self.seed], "spawn_x": [self.spawn[0]], "spawn_y": [self.spawn[1]], "chunk_size": [self.chunks.chunk_size], "time": [self.time]},
+			"boat": {name: [getattr(boat, name)] for name in ("x", "y", "orientation", "last_orientation", "speed", "acceleration", "angular_velocity", "reef", "rudder", "sail", "stopped", "wake_timer")},
+			"wind": {name: [getattr(wind, name)] for name in ("base_direction", "base_speed", "current_direction", "current_speed", "interval", "last_change")},
+		}
+		tables["boat"]["island_x"] = [island.x if island else float("nan")]
+		tables["boat"]["island_y"] = [island.y if island else float("nan")]
+		chunks = list(self.chunks.chunks.values())
+		tables["chunks"] = {"cx": [chunk.cx for chunk in chunks], "cy": [chunk.cy for chunk in chunks]}
+		islands = [(index, island) for index, chunk in enumerate(chunks) for island in chunk.islands]
+		tables["islands"] = {
+			"chunk": [index for index, _ in islands],
+			"x": [island.x for _, island in islands],
+			"y": [island.y for _, island in islands],
+			"size": [island.size for _, island in islands],
+			"name": [island.name for _, island in islands],
+		}
+		rocks = [(index, rock) for index, chunk in enumerate(chunks) for rock in chunk.rocks]
+		tables["rocks"] = {
+			"chunk": [index for index, _ in rocks],
+			"x": [rock.x for _, rock in rocks],
+			"y": [rock.y for _, rock in rocks],
+			"size": [rock.size for _, rock in rocks],
+		}
+		nests = [(index, nest) for index, chunk in enumerate(chunks) for nest in chunk.nests]
+		tables["nests"] = {
+			"chunk": [index for index, _ in nests],
+			"x": [nest[0] for _, nest in nests],
+			"y": [nest[1] for _, nest in nests],
+			"count": [nest[2] for _, nest in nests],
+			"max_radius": [nest[3] for _, nest in nests],
+		}
+		return tables
+
+	def update_chunks(self, force = False):
+		loaded, unloaded = self.chunks.update(self.boat.x, self.boat.y)
+		if not (loaded or unloaded or force):
+			return
+		for chunk in unloaded:
+			self.remove_chunk(chunk)
+		for chunk in loaded:
+			self.add_chunk(chunk)
+		chunks = self.chunks.chunks.values()
+		self.islands = [island for chunk in chunks for island in chunk.islands]
+		self.rocks = [rock for chunk in chunks for rock in chunk.rocks]
+		self.fleet.prune(self.chunks)
+		self.fleet.forget_targets(self.islands)
+		#Steps only wrap the clouds that drift. Those too far off to step are wrapped here, well before the boat
+		#could get near where they belong.
+		self.clouds.wrap(self.boat.x, self.boat.y)
+
+	def update(self, dt, current_time, cam_x, cam_y):
+		#One physics step of dt seconds
+		boat = self.boat
+		self.docked = None
+		self.store_previous()
+		with self.profiler.span("chunks"):
+			self.update_chunks()
+		with self.profiler.span("lod"):
+			plan = self.lod.plan(dt, cam_x + sett.WIDTH / 2, cam_y + sett.HEIGHT / 2)
+		self.profiler.count("updated", sum(len(rows) for rows, _ in plan.values()))
+		self.profiler.count("deferred", self.lod.deferred)
+		with self.profiler.span("wind"):
+			cloud_wind, fleet_wind = self.update_wind(current_time, plan[self.clouds][0], plan[self.fleet][0])
+		with self.profiler.span("clouds"):
+			rows, step = plan[self.clouds]
+			self.clouds.apply_wind(*cloud_wind, step, boat.x, boat.y, rows)
+		with self.profiler.span("seagulls"):
+			self.seagulls.update(*plan[self.seagulls], current_time)
+		with self.profiler.span("fleet"):
+			self.fleet.update(*plan[self.fleet], current_time, *fleet_wind, self.islands, (self.rock_grid, self.island_grid))
+		if not boat.stopped:
+			with self.profiler.span("boat"):
+				for action, direction in self.controls.items():
+					getattr(boat, action)(direction * sett.CONTROL_RATES[action] * dt)
+				start_x, start_y = boat.x, boat.y
+				boat.apply_wind(*self.boat_wind, dt)
+				boat.move(dt)
+			with self.profiler.span("collision"):
+				self.collide(start_x, start_y)
+
+	def collide(self, start_x, start_y):
+		#Sweeps the boat's move this step, so no step is long enough to pass through anything
+		boat = self.boat
+		end_x, end_y = boat.x, boat.y
+		#Rocks are hit by the boat's hull, islands docked at once its center is over the shore
+		rock, rock_t = sweep(start_x, start_y, end_x, end_y, self.rock_grid.query(*sweep_bounds(start_x, start_y, end_x, end_y, boat.size)), boat.size)
+		island, island_t = sweep(start_x, start_y, end_x, end_y, self.island_grid.query(*sweep_bounds(start_x, start_y, end_x, end_y)))
+		obstacle, t = (island, island_t) if island and island_t <= rock_t else (rock, rock_t)
+		if not obstacle:
+			return
+		#Back to the point of contact
+		boat.x = start_x + (end_x - start_x) * t
+		boat.y = start_y + (end_y - start_y) * t
+		if obstacle is island and island.check_docking(boat):
+			boat.stop_at_obstacle(island)
+			self.docked = island
+		else:
+			#A rock, or an island approached too fast to dock
+			bounce_back(boat, obstacle, obstacle.radius_toward(boat.x, boat.y))
+
+	def update_wind(self, current_time, clouds, fleet):
+		#Returns the wind at the clouds and NPC boats in those rows (the ones stepping), the boat's goes in boat_wind
+		wind, boat = self.wind, self.boat
+		wind.update_wind(current_time)
+		self.wind_field.update(current_time)
+		#All of them and the boat (last) in one lookup
+		x = np.concatenate((self.clouds.x[clouds], self.fleet.x[fleet], [boat.x]))
+		y = np.concatenate((self.clouds.y[clouds], self.fleet.y[fleet], [boat.y]))
+		direction, speed = self.wind_field.sample(x, y, wind.current_direction, wind.current_speed)
+		count = len(clouds)
+		self.boat_wind = (float(direction[-1]), float(speed[-1]))
+		return (direction[:count], speed[:count]), (direction[count:-1], speed[count:-1])
+
+	def draw(self, screen, cam_x, cam_y, alpha = 1):
+		self.draw_static(screen, cam_x, cam_y)
+		return self.draw_dynamic(screen, cam_x, cam_y, alpha)
+
+	def draw_dynamic(self, screen, cam_x, cam_y, alpha = 1):
+		#Everything that can change while the camera holds still, returns the rects drawn
+		rects = []
+		self.clouds.interpolate(alpha)
+		self.fleet.interpolate(alpha)
+		self.seagulls.interpolate(alpha)
+		with self.profiler.span("draw_boat"):
+			rects.append(self.boat.draw(screen, cam_x, cam_y, alpha))
+		with self.profiler.span("draw_fleet"):
+			for vessel in self.fleet.visible(cam_x, cam_y, 20):
+				rects.append(vessel.draw(screen, cam_x, cam_y))
+		with self.profiler.span("draw_seagulls"):
+			for seagull in self.seagulls.visible(cam_x, cam_y, 20):
+				rects.append(seagull.draw(screen, cam_x, cam_y))
+		with self.profiler.span("draw_clouds"):
+			for cloud in self.clouds.visible(cam_x, cam_y, 50):
+				rects.append(cloud.draw(screen, cam_x, cam_y))
+		self.profiler.count("drawn", len(rects))
+		self.profiler.count("culled", 1 + len(self.fleet) + len(self.seagulls) + len(self.clouds) - len(rects))
+		return rects
+
+	def draw_static(self, screen, cam_x, cam_y):
+		view = (cam_x, cam_y, cam_x + sett.WIDTH, cam_y + sett.HEIGHT)
+		with self.profiler.span("draw_rocks"):
+			for rock in self.rock_grid.query(*view):
+				rock.draw(screen, cam_x, cam_y)
+		with self.profiler.span("draw_islands"):
+			for island in self.island_grid.query(*view):
+				island.draw(screen, cam_x, cam_y)